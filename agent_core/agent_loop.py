@@ -1,11 +1,12 @@
 """Agent Loop - Implementasi Agent Loop (Plan, Think, Execute, Reflect, Synthesize)."""
 
+import asyncio
 import json
 import logging
 import os
 import re
 import time
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Callable, Optional
 
 from agent_core.context_manager import ContextManager
 from agent_core.knowledge_base import KnowledgeBase
@@ -449,7 +450,31 @@ class AgentLoop:
                 return {"type": "think", "thought": f"Reflection failed but continuing with remaining steps: {remaining_steps[0]}"}
             return {"type": "respond", "message": f"Task completed. Result: {result_truncated}"}
 
-    async def process_request(self, user_input: str) -> str:
+    async def process_request_stream(self, user_input: str) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        streamed: list[str] = []
+
+        task = asyncio.create_task(self.process_request(user_input, on_final_chunk=queue.put_nowait))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    break
+                streamed.append(chunk)
+                yield chunk
+            response = await task
+        finally:
+            if not task.done():
+                task.cancel()
+        sent = "".join(streamed)
+        if response.startswith(sent):
+            if len(response) > len(sent):
+                yield response[len(sent):]
+        else:
+            yield f"\n\n{response}"
+
+    async def process_request(self, user_input: str, on_final_chunk: Optional[Callable[[str], Any]] = None) -> str:
         self.context_manager.add_message("user", user_input)
         self.iteration_count = 0
         self.execution_log.clear()
@@ -666,7 +691,7 @@ class AgentLoop:
                     return response
 
             self.state = AgentState.SYNTHESIZING
-            final = await self._generate_final_response(user_input)
+            final = await self._generate_final_response(user_input, on_final_chunk)
             self.context_manager.add_message("assistant", final)
             self.state = AgentState.COMPLETED
             duration_total = int((time.time() - start_time) * 1000)
@@ -1258,7 +1283,16 @@ class AgentLoop:
 
         return {"type": "respond", "message": raw}
 
-    async def _generate_final_response(self, user_input: str = "") -> str:
+    async def _chat_with_chunks(self, prompt: str, on_chunk: Optional[Callable[[str], Any]] = None) -> str:
+        if on_chunk is None:
+            return await self.llm.chat(prompt)
+        parts = []
+        async for chunk in self.llm.chat_stream(prompt):
+            parts.append(chunk)
+            on_chunk(chunk)
+        return "".join(parts)
+
+    async def _generate_final_response(self, user_input: str = "", on_chunk: Optional[Callable[[str], Any]] = None) -> str:
         self.state = AgentState.SYNTHESIZING
         logger.info("Phase 4 - SYNTHESIS: Generating final comprehensive response...")
 
@@ -1317,13 +1351,14 @@ class AgentLoop:
                 user_input=user_input,
                 execution_summary=execution_summary,
             )
-            llm_response = await self.llm.chat(prompt)
-            return llm_response + structured_appendix
-
-        context = self.context_manager.get_context_window()
-        prompt = self._build_llm_prompt(context)
-        prompt += "\n\n[System]: Berikan ringkasan akhir dari semua yang sudah dilakukan. Respons sebagai teks biasa, bukan JSON."
-        llm_response = await self.llm.chat(prompt)
+            llm_response = await self._chat_with_chunks(prompt, on_chunk)
+        else:
+            context = self.context_manager.get_context_window()
+            prompt = self._build_llm_prompt(context)
+            prompt += "\n\n[System]: Berikan ringkasan akhir dari semua yang sudah dilakukan. Respons sebagai teks biasa, bukan JSON."
+            llm_response = await self._chat_with_chunks(prompt, on_chunk)
+        if on_chunk is not None and structured_appendix:
+            on_chunk(structured_appendix)
         return llm_response + structured_appendix
 
     def _save_to_knowledge(self, user_input: str, response: str):
@@ -1366,4 +1401,7 @@ class AgentLoop:
                     await tool.cleanup()
                 except Exception as e:
                     logger.debug(f"Error cleanup {tool_name}: {e}")
+        self.meta_learner.flush()
+        self.rlhf_engine.flush()
+        self.security_manager.flush()
         await self.llm.close()
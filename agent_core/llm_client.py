@@ -1,12 +1,14 @@
 """LLM Client - Menghubungkan agen ke API AI dengan multi-model support, retry logic, validasi data, dan MCP integration."""
 
 import asyncio
+import atexit
 import json
 import logging
 import re
 import time
 import random
-from typing import Optional, AsyncIterator
+from types import MappingProxyType
+from typing import Mapping, Optional, AsyncIterator
 
 import aiohttp
 
@@ -20,7 +22,7 @@ DEFAULT_API_BASE = "https://22f0ee02-5482-4584-a7aa-bb5f61e50c6b-00-iq4otn6awuiy
 DEFAULT_PROVIDER = "Perplexity"
 DEFAULT_MODEL = "claude40opusthinking_labs"
 
-AVAILABLE_MODELS = {
+_AVAILABLE_MODELS = {
     "gpt5_thinking": {
         "name": "GPT-5 Thinking",
         "provider": "Perplexity",
@@ -113,7 +115,7 @@ AVAILABLE_MODELS = {
     },
 }
 
-MODEL_CATEGORIES = {
+_MODEL_CATEGORIES = {
     "thinking": "Model dengan kemampuan reasoning/thinking mendalam",
     "reasoning": "Model optimized untuk penalaran logis",
     "general": "Model serbaguna untuk berbagai tugas",
@@ -121,6 +123,26 @@ MODEL_CATEGORIES = {
     "labs": "Model eksperimental/labs terbaru",
 }
 
+AVAILABLE_MODELS: Mapping[str, Mapping[str, str]] = MappingProxyType(
+    {k: MappingProxyType(v) for k, v in _AVAILABLE_MODELS.items()}
+)
+MODEL_CATEGORIES: Mapping[str, str] = MappingProxyType(_MODEL_CATEGORIES)
+
+MODELS_BY_CATEGORY: dict[str, tuple[str, ...]] = {}
+_MODEL_LIST: tuple[dict, ...] = ()
+_MODEL_LIST_BY_CATEGORY: dict[str, tuple[dict, ...]] = {}
+for _model_id, _info in AVAILABLE_MODELS.items():
+    MODELS_BY_CATEGORY[_info["category"]] = MODELS_BY_CATEGORY.get(_info["category"], ()) + (_model_id,)
+    _entry = {
+        "id": _model_id,
+        "name": _info["name"],
+        "provider": _info["provider"],
+        "category": _info["category"],
+        "description": _info["description"],
+    }
+    _MODEL_LIST += (_entry,)
+    _MODEL_LIST_BY_CATEGORY[_info["category"]] = _MODEL_LIST_BY_CATEGORY.get(_info["category"], ()) + (_entry,)
+
 RETRY_CONFIG = {
     "max_retries": 5,
     "base_delay": 1.0,
@@ -128,6 +150,16 @@ RETRY_CONFIG = {
     "backoff_factor": 2.0,
     "jitter": True,
     "retryable_status_codes": {429, 500, 502, 503, 504},
+    "total_budget": 60.0,
+}
+
+CONNECTOR_CONFIG = {
+    "limit": 100,
+    "limit_per_host": 32,
+    "ttl_dns_cache": 300,
+    "keepalive_timeout": 75,
+    "connect_timeout": 10,
+    "max_drain_bytes": 64 * 1024,
 }
 
 DANGEROUS_PATTERNS = [
@@ -141,59 +173,211 @@ DANGEROUS_PATTERNS = [
     re.compile(r'os\.system', re.IGNORECASE),
 ]
 
+_COMBINED_DANGEROUS = re.compile(
+    "|".join(f"(?:{p.pattern})" for p in DANGEROUS_PATTERNS),
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def _prefix_pattern(literal: str, complete_suffix: Optional[str] = None) -> str:
+    """Regex untuk prefix tak-kosong dari `literal`; literal utuh hanya jika diikuti `complete_suffix`."""
+    inner = re.escape(literal[-1]) + complete_suffix if complete_suffix is not None else ""
+    for ch in reversed(literal[:-1]):
+        inner = re.escape(ch) + (f"(?:{inner})?" if inner else "")
+    return inner
+
+
+# Ekor teks yang masih bisa tumbuh menjadi salah satu DANGEROUS_PATTERNS bila chunk berikutnya tiba.
+_DANGEROUS_PARTIAL_TAIL = re.compile(
+    "(?:" + "|".join((
+        _prefix_pattern("<script", r"[^>]*(?:>.*)?"),
+        _prefix_pattern("javascript:"),
+        r"o(?:n\w*\s*)?",
+        _prefix_pattern("eval", r"\s*"),
+        _prefix_pattern("__import__", r"\s*"),
+        _prefix_pattern("exec", r"\s*"),
+        _prefix_pattern("subprocess"),
+        _prefix_pattern("os.system"),
+    )) + r")\Z",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+_shared_session: Optional[aiohttp.ClientSession] = None
+_shared_session_loop: Optional[asyncio.AbstractEventLoop] = None
+_shared_session_lock: Optional[asyncio.Lock] = None
+_shared_session_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def _retire_session(session: Optional[aiohttp.ClientSession], loop: Optional[asyncio.AbstractEventLoop]):
+    """Tutup session milik event loop lain; session aiohttp hanya bisa di-close di loop asalnya."""
+    if session is None or session.closed:
+        return
+    if loop is not None and not loop.is_closed() and loop.is_running():
+        asyncio.run_coroutine_threadsafe(session.close(), loop)
+        return
+    # Loop asal sudah berhenti: lepas connector dari session dan tutup socket-nya dari loop ini.
+    connector = session.connector
+    session.detach()
+    if connector is not None:
+        try:
+            await connector.close()
+        except Exception as e:
+            logger.debug(f"Gagal menutup connector session lama: {e}")
+
+
+async def _get_shared_session() -> aiohttp.ClientSession:
+    global _shared_session, _shared_session_loop, _shared_session_lock, _shared_session_lock_loop
+    loop = asyncio.get_running_loop()
+    if _shared_session is not None and not _shared_session.closed and _shared_session_loop is loop:
+        return _shared_session
+    if _shared_session_lock is None or _shared_session_lock_loop is not loop:
+        _shared_session_lock = asyncio.Lock()
+        _shared_session_lock_loop = loop
+    async with _shared_session_lock:
+        if _shared_session is None or _shared_session.closed or _shared_session_loop is not loop:
+            await _retire_session(_shared_session, _shared_session_loop)
+            connector = aiohttp.TCPConnector(
+                limit=CONNECTOR_CONFIG["limit"],
+                limit_per_host=CONNECTOR_CONFIG["limit_per_host"],
+                ttl_dns_cache=CONNECTOR_CONFIG["ttl_dns_cache"],
+                keepalive_timeout=CONNECTOR_CONFIG["keepalive_timeout"],
+                enable_cleanup_closed=True,
+            )
+            _shared_session = aiohttp.ClientSession(connector=connector)
+            _shared_session_loop = loop
+    return _shared_session
+
+
+async def shutdown_shared_session():
+    """Tutup session aiohttp bersama milik proses ini.
+
+    Ini teardown yang sebenarnya untuk koneksi HTTP; ``LLMClient.close()`` tidak
+    menyentuh session bersama karena dipakai semua instance LLMClient.
+    """
+    global _shared_session, _shared_session_loop
+    if _shared_session is not None and not _shared_session.closed:
+        if _shared_session_loop is asyncio.get_running_loop():
+            await _shared_session.close()
+        else:
+            await _retire_session(_shared_session, _shared_session_loop)
+    _shared_session = None
+    _shared_session_loop = None
+
+
+@atexit.register
+def _close_shared_session_at_exit():
+    if _shared_session is None or _shared_session.closed:
+        return
+    # atexit berjalan di luar loop; loop hanya masih berjalan bila hidup di thread lain.
+    loop = _shared_session_loop
+    if loop is not None and not loop.is_closed() and loop.is_running():
+        asyncio.run_coroutine_threadsafe(shutdown_shared_session(), loop)
+    else:
+        logger.warning("Shared aiohttp session tidak ditutup; panggil shutdown_shared_session() sebelum keluar")
+
+
+async def _discard_response(resp: aiohttp.ClientResponse, head: int = 0) -> bytes:
+    """Kembalikan paling banyak ``head`` byte awal body lalu lepaskan koneksinya.
+
+    Body kecil dikuras agar koneksi keep-alive kembali ke pool; body besar atau
+    tanpa Content-Length membuat koneksi ditutup daripada diunduh seluruhnya.
+    """
+    prefix = b""
+    try:
+        if head:
+            prefix = await resp.content.read(head)
+        length = resp.content_length
+        if length is not None and length <= CONNECTOR_CONFIG["max_drain_bytes"]:
+            await resp.content.read()
+            resp.release()
+            return prefix
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        pass
+    resp.close()
+    return prefix
+
 
 def sanitize_response(text: str) -> str:
     if not text or not isinstance(text, str):
         return ""
-    cleaned = text
-    for pattern in DANGEROUS_PATTERNS:
-        cleaned = pattern.sub('[FILTERED]', cleaned)
-    return cleaned
+    if not _COMBINED_DANGEROUS.search(text):
+        return text
+    return _COMBINED_DANGEROUS.sub('[FILTERED]', text)
+
+
+class _StreamSanitizer:
+    """Sanitasi stream per batas chunk: hanya teks sejak posisi awal pola yang mungkin masih terpotong yang ditahan."""
+
+    def __init__(self):
+        self._pending = ""
 
+    def feed(self, chunk: str) -> str:
+        buf = self._pending + chunk
+        if _COMBINED_DANGEROUS.search(buf):
+            buf = _COMBINED_DANGEROUS.sub('[FILTERED]', buf)
+        partial = _DANGEROUS_PARTIAL_TAIL.search(buf)
+        if partial is None:
+            self._pending = ""
+            return buf
+        self._pending = buf[partial.start():]
+        return buf[:partial.start()]
 
-def validate_json_response(data) -> dict:
+    def flush(self) -> str:
+        tail, self._pending = self._pending, ""
+        return tail
+
+
+def validate_json_response(data, sanitize: bool = True) -> dict:
     if data is None:
         return {"valid": False, "error": "Data kosong", "data": None}
     if isinstance(data, str):
         try:
             data = json.loads(data)
-        except (json.JSONDecodeError, TypeError):
+        except json.JSONDecodeError:
             return {"valid": True, "data": data, "type": "text"}
     if isinstance(data, dict):
-        sanitized = {}
-        for k, v in data.items():
-            if isinstance(v, str):
-                sanitized[k] = sanitize_response(v)
-            elif isinstance(v, (dict, list)):
-                sanitized[k] = v
-            else:
-                sanitized[k] = v
-        return {"valid": True, "data": sanitized, "type": "dict"}
+        if sanitize:
+            data = {k: sanitize_response(v) if isinstance(v, str) else v for k, v in data.items()}
+        return {"valid": True, "data": data, "type": "dict"}
     if isinstance(data, list):
         return {"valid": True, "data": data, "type": "list"}
     return {"valid": True, "data": data, "type": type(data).__name__}
 
 
+_CONTENT_KEYS = ("content", "text", "message")
+
+_ROLE_PREFIX = {"system": "[System]: ", "user": "User: ", "assistant": "Assistant: "}
+
+_QUERY_MODES = (
+    ("search", ("cari", "search", "find", "temukan")),
+    ("analysis", ("analisis", "analyze", "review")),
+    ("generation", ("tulis", "write", "buat", "create", "generate")),
+    ("explanation", ("jelaskan", "explain", "apa itu", "what is")),
+    ("translation", ("terjemahkan", "translate")),
+    ("summarization", ("ringkas", "summarize", "summary")),
+    ("coding", ("kode", "code", "program", "script")),
+)
+_QUERY_MODE_PRIORITY = {mode: i for i, (mode, _) in enumerate(_QUERY_MODES)}
+_QUERY_MODE_RE = re.compile(
+    "|".join(
+        f"(?P<{mode}>{'|'.join(re.escape(w) for w in words)})"
+        for mode, words in _QUERY_MODES
+    ),
+    re.IGNORECASE,
+)
+
+
 def generate_query_params(user_intent: str) -> dict:
-    intent_lower = user_intent.lower()
-    params = {"text": user_intent}
-    if any(w in intent_lower for w in ["cari", "search", "find", "temukan"]):
-        params["mode"] = "search"
-    elif any(w in intent_lower for w in ["analisis", "analyze", "review"]):
-        params["mode"] = "analysis"
-    elif any(w in intent_lower for w in ["tulis", "write", "buat", "create", "generate"]):
-        params["mode"] = "generation"
-    elif any(w in intent_lower for w in ["jelaskan", "explain", "apa itu", "what is"]):
-        params["mode"] = "explanation"
-    elif any(w in intent_lower for w in ["terjemahkan", "translate"]):
-        params["mode"] = "translation"
-    elif any(w in intent_lower for w in ["ringkas", "summarize", "summary"]):
-        params["mode"] = "summarization"
-    elif any(w in intent_lower for w in ["kode", "code", "program", "script"]):
-        params["mode"] = "coding"
-    else:
-        params["mode"] = "general"
-    return params
+    best_mode = None
+    best_priority = len(_QUERY_MODES)
+    for match in _QUERY_MODE_RE.finditer(user_intent):
+        priority = _QUERY_MODE_PRIORITY[match.lastgroup]
+        if priority < best_priority:
+            best_mode, best_priority = match.lastgroup, priority
+            if priority == 0:
+                break
+    return {"text": user_intent, "mode": best_mode or "general"}
 
 
 class LLMClient:
@@ -209,7 +393,11 @@ class LLMClient:
         self.model = model or DEFAULT_MODEL
         self.timeout = timeout
         self.stream_url = f"{self.api_base}/stream"
-        self._session: Optional[aiohttp.ClientSession] = None
+        self._request_timeout = aiohttp.ClientTimeout(
+            total=timeout,
+            connect=CONNECTOR_CONFIG["connect_timeout"],
+            sock_connect=CONNECTOR_CONFIG["connect_timeout"],
+        )
         self._retry_stats = {
             "total_requests": 0,
             "total_retries": 0,
@@ -219,10 +407,13 @@ class LLMClient:
         }
         self._mcp_client: Optional[MCPClient] = None
         self._mcp_enabled = False
+        self._mcp_initialized = False
         self._last_fallback_model: Optional[str] = None
-        self._init_mcp()
+        self._current_model_cache: Optional[dict] = None
+        self._payload_template = {"provider": self.provider, "model": self.model}
 
     def _init_mcp(self):
+        self._mcp_initialized = True
         try:
             registry = create_default_registry()
             self._mcp_client = MCPClient(registry)
@@ -232,50 +423,52 @@ class LLMClient:
         except Exception as e:
             logger.warning(f"MCP Client gagal diinisialisasi, menggunakan direct mode: {e}")
             self._mcp_enabled = False
+        self._current_model_cache = None
 
     @property
     def mcp_client(self) -> Optional[MCPClient]:
+        if not self._mcp_initialized:
+            self._init_mcp()
         return self._mcp_client
 
     @property
     def mcp_enabled(self) -> bool:
-        return self._mcp_enabled and self._mcp_client is not None
+        return self._mcp_enabled and self.mcp_client is not None
 
     def enable_mcp(self, enabled: bool = True):
+        if not self._mcp_initialized:
+            self._init_mcp()
         self._mcp_enabled = enabled
+        self._current_model_cache = None
         logger.info(f"MCP mode {'diaktifkan' if enabled else 'dinonaktifkan'}")
 
     def get_mcp_stats(self) -> dict:
-        if self._mcp_client:
+        if self.mcp_client:
             return self._mcp_client.get_stats()
         return {}
 
     async def mcp_health_check(self) -> dict:
-        if self._mcp_client:
+        if self.mcp_client:
             return await self._mcp_client.health_check()
         return {"status": "mcp_not_initialized"}
 
     def register_mcp_provider(self, config: MCPProviderConfig) -> bool:
-        if self._mcp_client:
+        if self.mcp_client:
             return self._mcp_client.register_provider(config)
         return False
 
     def list_mcp_providers(self) -> list[dict]:
-        if self._mcp_client:
+        if self.mcp_client:
             return self._mcp_client.list_providers()
         return []
 
     def list_mcp_models(self) -> list[dict]:
-        if self._mcp_client:
+        if self.mcp_client:
             return self._mcp_client.list_models()
         return []
 
     async def _get_session(self) -> aiohttp.ClientSession:
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=self.timeout)
-            )
-        return self._session
+        return await _get_shared_session()
 
     def set_model(self, model: str) -> bool:
         if model in AVAILABLE_MODELS:
@@ -283,19 +476,28 @@ class LLMClient:
             self.provider = AVAILABLE_MODELS[model]["provider"]
             if self._mcp_client:
                 self._mcp_client.set_model(model)
+            self._current_model_cache = None
+            self._payload_template = {"provider": self.provider, "model": self.model}
             logger.info(f"Model diubah ke: {model} (provider: {self.provider})")
             return True
-        if self._mcp_client:
+        if self.mcp_client:
             mcp_models = [m["model"] for m in self._mcp_client.list_models()]
             if model in mcp_models:
                 self._mcp_client.set_model(model)
                 self.model = model
+                self._current_model_cache = None
+                self._payload_template = {"provider": self.provider, "model": self.model}
                 logger.info(f"Model diubah via MCP: {model}")
                 return True
         logger.warning(f"Model tidak dikenal: {model}")
         return False
 
     def get_current_model(self) -> dict:
+        if self._current_model_cache is None:
+            self._current_model_cache = self._build_current_model()
+        return dict(self._current_model_cache)
+
+    def _build_current_model(self) -> dict:
         model_info = AVAILABLE_MODELS.get(self.model, {})
         result = {
             "model": self.model,
@@ -311,22 +513,13 @@ class LLMClient:
 
     @staticmethod
     def list_models(category: Optional[str] = None) -> list[dict]:
-        models = []
-        for model_id, info in AVAILABLE_MODELS.items():
-            if category and info.get("category") != category:
-                continue
-            models.append({
-                "id": model_id,
-                "name": info["name"],
-                "provider": info["provider"],
-                "category": info["category"],
-                "description": info["description"],
-            })
-        return models
+        if category:
+            return list(_MODEL_LIST_BY_CATEGORY.get(category, ()))
+        return list(_MODEL_LIST)
 
     @staticmethod
-    def list_categories() -> dict:
-        return MODEL_CATEGORIES.copy()
+    def list_categories() -> Mapping[str, str]:
+        return MODEL_CATEGORIES
 
     def _calculate_retry_delay(self, attempt: int) -> float:
         delay = min(
@@ -342,19 +535,23 @@ class LLMClient:
     ) -> aiohttp.ClientResponse:
         self._retry_stats["total_requests"] += 1
         last_exception = None
+        deadline = time.monotonic() + RETRY_CONFIG["total_budget"]
+        max_retries = RETRY_CONFIG["max_retries"]
+        retryable = RETRY_CONFIG["retryable_status_codes"]
 
-        for attempt in range(RETRY_CONFIG["max_retries"] + 1):
+        for attempt in range(max_retries + 1):
             try:
                 resp = await session.post(
                     self.stream_url,
                     json=payload,
                     headers={"Content-Type": "application/json"},
+                    timeout=self._request_timeout,
                 )
                 if resp.status == 200:
                     return resp
 
-                if resp.status in RETRY_CONFIG["retryable_status_codes"]:
-                    error_text = await resp.text()
+                if resp.status in retryable:
+                    error_text = (await _discard_response(resp, head=256)).decode("utf-8", errors="replace")
                     retry_after = resp.headers.get("Retry-After")
                     if retry_after:
                         try:
@@ -366,24 +563,29 @@ class LLMClient:
 
                     self._retry_stats["total_retries"] += 1
                     logger.warning(
-                        f"API {resp.status} (attempt {attempt+1}/{RETRY_CONFIG['max_retries']+1}), "
+                        f"API {resp.status} (attempt {attempt+1}/{max_retries+1}), "
                         f"retry in {delay:.1f}s: {error_text[:100]}"
                     )
-                    await resp.release()
-                    await asyncio.sleep(delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    await asyncio.sleep(min(delay, remaining))
                     continue
                 else:
                     return resp
 
             except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                 last_exception = e
-                if attempt < RETRY_CONFIG["max_retries"]:
+                if attempt < max_retries:
                     delay = self._calculate_retry_delay(attempt)
                     self._retry_stats["total_retries"] += 1
                     logger.warning(
                         f"Connection error (attempt {attempt+1}), retry in {delay:.1f}s: {e}"
                     )
-                    await asyncio.sleep(delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    await asyncio.sleep(min(delay, remaining))
                 else:
                     self._retry_stats["total_failures"] += 1
                     self._retry_stats["last_error"] = str(e)
@@ -391,18 +593,16 @@ class LLMClient:
 
         self._retry_stats["total_failures"] += 1
         if last_exception:
+            self._retry_stats["last_error"] = str(last_exception)
             raise last_exception
         raise aiohttp.ClientError("Max retries exceeded")
 
     async def _try_fallback_models(self, session: aiohttp.ClientSession, payload: dict) -> Optional[aiohttp.ClientResponse]:
         original_model = self.model
-        fallback_models = [
-            model_id for model_id in AVAILABLE_MODELS
-            if model_id != original_model
-            and AVAILABLE_MODELS[model_id].get("category") == AVAILABLE_MODELS.get(original_model, {}).get("category", "general")
-        ]
-        if not fallback_models:
-            fallback_models = [m for m in AVAILABLE_MODELS if m != original_model]
+        category = AVAILABLE_MODELS.get(original_model, {}).get("category", "general")
+        fallback_models = tuple(
+            m for m in MODELS_BY_CATEGORY.get(category, ()) if m != original_model
+        ) or tuple(m for m in AVAILABLE_MODELS if m != original_model)
 
         for fallback_model in fallback_models[:3]:
             try:
@@ -412,12 +612,13 @@ class LLMClient:
                     self.stream_url,
                     json=fallback_payload,
                     headers={"Content-Type": "application/json"},
+                    timeout=self._request_timeout,
                 )
                 if resp.status == 200:
                     logger.info(f"Fallback model {fallback_model} succeeded (replacing primary model {original_model})")
                     self._last_fallback_model = fallback_model
                     return resp
-                await resp.release()
+                await _discard_response(resp)
             except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                 logger.warning(f"Fallback model {fallback_model} failed: {e}")
                 continue
@@ -426,53 +627,72 @@ class LLMClient:
 
     async def chat(self, text: str) -> str:
         full_response = []
-        async for chunk in self.chat_stream(text):
+        async for chunk in self._chat_stream_raw(text):
             full_response.append(chunk)
-        return "".join(full_response)
+        return sanitize_response("".join(full_response))
 
-    async def _read_stream_line(self, content: aiohttp.StreamReader, chunk_timeout: float = 30.0) -> Optional[bytes]:
+    async def _read_stream_line(self, content: aiohttp.StreamReader, chunk_timeout: Optional[float] = 30.0) -> Optional[bytes]:
         try:
             line = await asyncio.wait_for(content.readline(), timeout=chunk_timeout)
-            if not line:
-                return None
-            return line
         except asyncio.TimeoutError:
             raise asyncio.TimeoutError(f"No data received for {chunk_timeout}s")
-
-    def _parse_and_yield_line(self, decoded: str) -> Optional[str]:
-        if not decoded or not decoded.startswith("data: "):
-            return None
-        data_part = decoded[6:]
-        if data_part == "[DONE]":
+        if not line:
             return None
+        return line
+
+    async def _iter_sse_text(self, content: aiohttp.StreamReader, chunk_timeout: Optional[float] = 30.0) -> AsyncIterator[str]:
+        # Baris kosong (LF atau CRLF) hanya menutup event SSE; setiap baris data diproses saat tiba.
+        # Baris non-data (heartbeat, komentar) dilewati tanpa disalin; hanya payload yang di-strip.
+        content_key = None
+        while True:
+            line = await self._read_stream_line(content, chunk_timeout)
+            if line is None:
+                return
+            if not line.startswith(b"data: "):
+                continue
+            data_part = line[6:].strip()
+            if data_part == b"[DONE]":
+                return
+            result, content_key = self._parse_and_yield_line(data_part, content_key)
+            if result is not None:
+                yield result
+
+    def _parse_and_yield_line(self, data_part: bytes, content_key: Optional[str] = None) -> tuple[Optional[str], Optional[str]]:
         try:
             parsed = json.loads(data_part)
-            validated = validate_json_response(parsed)
-            if validated["valid"]:
-                if validated["type"] == "text" or isinstance(validated["data"], str):
-                    return sanitize_response(str(validated["data"]))
-                elif isinstance(validated["data"], dict):
-                    content = validated["data"].get("content") or validated["data"].get("text") or validated["data"].get("message")
+        except ValueError:
+            return data_part.decode("utf-8", errors="replace"), content_key
+        if isinstance(parsed, dict):
+            content = parsed.get(content_key) if content_key else None
+            if not content:
+                for key in _CONTENT_KEYS:
+                    content = parsed.get(key)
                     if content:
-                        return sanitize_response(str(content))
-                    else:
-                        return sanitize_response(json.dumps(validated["data"], ensure_ascii=False))
-                else:
-                    return sanitize_response(str(validated["data"]))
-            else:
-                logger.warning(f"Invalid response data: {validated.get('error')}")
-                return None
-        except json.JSONDecodeError:
-            return sanitize_response(data_part)
+                        content_key = key
+                        break
+            if content:
+                return str(content), content_key
+            return json.dumps(parsed, ensure_ascii=False), content_key
+        validated = validate_json_response(parsed, sanitize=False)
+        if validated["valid"]:
+            return str(validated["data"]), content_key
+        logger.warning(f"Invalid response data: {validated.get('error')}")
+        return None, content_key
 
     async def chat_stream(self, text: str) -> AsyncIterator[str]:
+        stream_filter = _StreamSanitizer()
+        async for chunk in self._chat_stream_raw(text):
+            cleaned = stream_filter.feed(chunk)
+            if cleaned:
+                yield cleaned
+        tail = stream_filter.flush()
+        if tail:
+            yield tail
+
+    async def _chat_stream_raw(self, text: str) -> AsyncIterator[str]:
         session = await self._get_session()
         query_params = generate_query_params(text)
-        payload = {
-            "text": text,
-            "provider": self.provider,
-            "model": self.model,
-        }
+        payload = {"text": text, **self._payload_template}
         self._last_fallback_model = None
         chunk_timeout = 30.0
 
@@ -493,7 +713,7 @@ class LLMClient:
         active_model = self._last_fallback_model or self.model
         try:
             if resp.status != 200:
-                error_text = await resp.text()
+                await _discard_response(resp)
                 logger.warning(f"API error {resp.status}, trying fallback models...")
                 model_key = self.model
                 self._retry_stats["model_errors"][model_key] = (
@@ -513,35 +733,16 @@ class LLMClient:
             if self._last_fallback_model:
                 logger.info(f"Streaming response from fallback model: {self._last_fallback_model}")
 
-            while True:
-                line = await self._read_stream_line(resp.content, chunk_timeout)
-                if line is None:
-                    break
-                decoded = line.decode("utf-8", errors="replace").strip()
-                if not decoded:
-                    continue
-                if decoded.startswith("data: "):
-                    data_part = decoded[6:]
-                    if data_part == "[DONE]":
-                        break
-                    result = self._parse_and_yield_line(decoded)
-                    if result is not None:
-                        yield result
+            async for result in self._iter_sse_text(resp.content, chunk_timeout):
+                yield result
         except asyncio.TimeoutError as te:
             logger.error(f"LLM streaming timeout (model: {active_model}): {te}, trying fallback...")
             fallback_resp = await self._try_fallback_models(session, payload)
             if fallback_resp and fallback_resp.status == 200:
                 if self._last_fallback_model:
                     logger.info(f"Recovered from streaming timeout using fallback model: {self._last_fallback_model}")
-                async for line in fallback_resp.content:
-                    decoded = line.decode("utf-8", errors="replace").strip()
-                    if decoded.startswith("data: "):
-                        data_part = decoded[6:]
-                        if data_part == "[DONE]":
-                            break
-                        result = self._parse_and_yield_line(decoded)
-                        if result is not None:
-                            yield result
+                async for result in self._iter_sse_text(fallback_resp.content, chunk_timeout=None):
+                    yield result
             else:
                 yield "[Error: Request timeout - all fallback models also failed]"
         except aiohttp.ClientError as e:
@@ -556,17 +757,11 @@ class LLMClient:
         return await self.chat(combined)
 
     async def chat_with_context(self, messages: list[dict]) -> str:
-        parts = []
-        for msg in messages:
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            if role == "system":
-                parts.append(f"[System]: {content}")
-            elif role == "user":
-                parts.append(f"User: {content}")
-            elif role == "assistant":
-                parts.append(f"Assistant: {content}")
-        combined = "\n\n".join(parts)
+        combined = "\n\n".join(
+            f"{_ROLE_PREFIX[role]}{msg.get('content', '')}"
+            for msg in messages
+            if (role := msg.get("role", "user")) in _ROLE_PREFIX
+        )
         return await self.chat(combined)
 
     def get_retry_stats(self) -> dict:
@@ -582,19 +777,13 @@ class LLMClient:
         }
 
     async def close(self):
-        if self._session and not self._session.closed:
-            await self._session.close()
-            self._session = None
+        """Tutup MCP client milik instance ini; koneksi HTTP ditutup lewat ``shutdown_shared_session()``."""
         if self._mcp_client:
             await self._mcp_client.close()
 
-    def __del__(self):
-        if self._session and not self._session.closed:
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    loop.create_task(self.close())
-                else:
-                    loop.run_until_complete(self.close())
-            except Exception:
-                pass
+    async def __aenter__(self) -> "LLMClient":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
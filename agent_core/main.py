@@ -1,13 +1,16 @@
 """Main - Titik masuk utama, menginisialisasi Agent Loop."""
 
 import asyncio
+import functools
+import importlib
 import logging
+import logging.handlers
 import os
 import sys
 import uuid
 import yaml
 
-from rich.console import Console
+from rich.console import Console, Group
 from rich.panel import Panel
 from rich.markdown import Markdown
 from rich.table import Table
@@ -16,8 +19,14 @@ from prompt_toolkit import PromptSession
 from prompt_toolkit.history import InMemoryHistory
 
 from agent_core.agent_loop import AgentLoop
+from agent_core.llm_client import shutdown_shared_session
 from agent_core.user_manager import UserManager
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 console = Console()
 logger = logging.getLogger("manus_agent")
 
@@ -25,7 +34,7 @@ logger = logging.getLogger("manus_agent")
 def load_config(config_path: str = "config/settings.yaml") -> dict:
     try:
         with open(config_path, "r") as f:
-            return yaml.safe_load(f)
+            return yaml.load(f, Loader=_YamlLoader)
     except FileNotFoundError:
         console.print(f"[yellow]Konfigurasi tidak ditemukan di {config_path}, menggunakan default.[/yellow]")
         return {
@@ -34,6 +43,25 @@ def load_config(config_path: str = "config/settings.yaml") -> dict:
         }
 
 
+class BufferedFileHandler(logging.FileHandler):
+    """FileHandler dengan buffer 64 KB; hanya record ERROR ke atas yang langsung di-flush."""
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, encoding=self.encoding, errors=self.errors, buffering=65536)
+
+    def emit(self, record: logging.LogRecord):
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.ERROR:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
 def setup_logging(config: dict):
     log_config = config.get("logging", {})
     log_dir = log_config.get("directory", "logs")
@@ -42,24 +70,33 @@ def setup_logging(config: dict):
     log_format = log_config.get("format", "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     log_level = config.get("agent", {}).get("log_level", "INFO")
 
-    logging.basicConfig(
-        level=getattr(logging, log_level, logging.INFO),
-        format=log_format,
-        handlers=[
-            logging.FileHandler(os.path.join(log_dir, "agent_activity.log")),
-        ],
+    activity_path = os.path.join(log_dir, "agent_activity.log")
+    error_path = os.path.join(log_dir, "error.log")
+    formatter = logging.Formatter(log_format)
+
+    activity_handler = BufferedFileHandler(activity_path)
+    activity_handler.setFormatter(formatter)
+    buffered_handler = logging.handlers.MemoryHandler(
+        capacity=512,
+        flushLevel=logging.ERROR,
+        target=activity_handler,
+        flushOnClose=True,
     )
 
-    error_handler = logging.FileHandler(os.path.join(log_dir, "error.log"))
+    error_handler = BufferedFileHandler(error_path)
     error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(logging.Formatter(log_format))
-    logging.getLogger().addHandler(error_handler)
+    error_handler.setFormatter(formatter)
 
+    logging.basicConfig(
+        level=getattr(logging, log_level, logging.INFO),
+        format=log_format,
+        handlers=[buffered_handler, error_handler],
+        force=True,
+    )
 
-def display_banner(config: dict):
-    agent_name = config.get("agent", {}).get("name", "Manus Agent")
-    version = config.get("agent", {}).get("version", "1.0.0")
 
+@functools.lru_cache(maxsize=4)
+def _banner_panel(agent_name: str, version: str) -> Panel:
     banner_text = f"""# {agent_name} v{version}
 
 Agen AI otonom dengan kemampuan:
@@ -75,27 +112,39 @@ Agen AI otonom dengan kemampuan:
 
 Powered by Dzeck AI API
 Ketik `help` untuk bantuan, `exit` untuk keluar."""
-    console.print(Panel(Markdown(banner_text), border_style="blue", title="Manus Agent"))
+    return Panel(Markdown(banner_text), border_style="blue", title="Manus Agent")
 
 
-def display_help():
+def display_banner(config: dict):
+    agent_name = config.get("agent", {}).get("name", "Manus Agent")
+    version = config.get("agent", {}).get("version", "1.0.0")
+    console.print(_banner_panel(agent_name, version))
+
+
+HELP_COMMANDS = (
+    ("help", "Tampilkan daftar perintah"),
+    ("status", "Tampilkan status agen"),
+    ("tools", "Tampilkan daftar alat yang tersedia"),
+    ("history", "Tampilkan riwayat percakapan"),
+    ("knowledge", "Tampilkan statistik knowledge base"),
+    ("clear", "Bersihkan konteks percakapan"),
+    ("plan", "Tampilkan rencana tugas saat ini"),
+    ("exit / quit", "Keluar dari agen"),
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _help_table() -> Table:
     table = Table(title="Perintah Tersedia", border_style="cyan")
     table.add_column("Perintah", style="green")
     table.add_column("Deskripsi", style="white")
-
-    commands = [
-        ("help", "Tampilkan daftar perintah"),
-        ("status", "Tampilkan status agen"),
-        ("tools", "Tampilkan daftar alat yang tersedia"),
-        ("history", "Tampilkan riwayat percakapan"),
-        ("knowledge", "Tampilkan statistik knowledge base"),
-        ("clear", "Bersihkan konteks percakapan"),
-        ("plan", "Tampilkan rencana tugas saat ini"),
-        ("exit / quit", "Keluar dari agen"),
-    ]
-    for cmd, desc in commands:
+    for cmd, desc in HELP_COMMANDS:
         table.add_row(cmd, desc)
-    console.print(table)
+    return table
+
+
+def display_help():
+    console.print(_help_table())
 
 
 def display_tools(agent: AgentLoop):
@@ -138,8 +187,6 @@ def display_knowledge(agent: AgentLoop):
     table.add_row("Ringkasan percakapan", str(stats["conversation_summaries"]))
     table.add_row("Log penggunaan tool", str(stats["tool_usage_logs"]))
 
-    console.print(table)
-
     tool_stats = agent.knowledge_base.get_tool_usage_stats()
     if tool_stats:
         tool_table = Table(title="Statistik Penggunaan Tool", border_style="cyan")
@@ -155,7 +202,64 @@ def display_knowledge(agent: AgentLoop):
                 str(ts["success_count"]),
                 f"{ts['avg_duration_ms']:.0f}ms",
             )
-        console.print(tool_table)
+        console.print(Group(table, tool_table))
+    else:
+        console.print(table)
+
+
+def display_history(agent: AgentLoop):
+    history = agent.context_manager.export_history()
+    if not history:
+        console.print("[dim]Belum ada riwayat percakapan.[/dim]")
+        return
+    lines = []
+    for msg in history[-10:]:
+        role_color = "green" if msg["role"] == "user" else "blue"
+        lines.append(f"[{role_color}][{msg['role']}][/{role_color}]: {msg['content'][:200]}")
+    console.print("\n".join(lines))
+
+
+def display_plan(agent: AgentLoop):
+    if agent.planner.tasks:
+        console.print(agent.planner.get_plan_summary())
+    else:
+        console.print("[dim]Belum ada rencana tugas.[/dim]")
+
+
+def clear_context(agent: AgentLoop):
+    agent.context_manager.clear()
+    console.print("[green]Konteks percakapan dibersihkan.[/green]")
+
+
+EXIT_COMMANDS = frozenset({"exit", "quit", "keluar"})
+
+COMMAND_HANDLERS = {
+    "help": lambda agent: display_help(),
+    "status": display_status,
+    "tools": display_tools,
+    "knowledge": display_knowledge,
+    "history": display_history,
+    "clear": clear_context,
+    "plan": display_plan,
+}
+
+
+class _StreamingPanel:
+    """Renderable untuk Live: Markdown dibangun ulang saat refresh, dan hanya bila ada chunk baru."""
+
+    def __init__(self):
+        self.parts: list[str] = []
+        self._dirty = True
+
+    def append(self, chunk: str):
+        self.parts.append(chunk)
+        self._dirty = True
+
+    def __call__(self) -> Panel:
+        if self._dirty:
+            self._dirty = False
+            self._panel = Panel(Markdown("".join(self.parts)), border_style="green", title="Manus")
+        return self._panel
 
 
 async def interactive_loop(agent: AgentLoop):
@@ -163,9 +267,7 @@ async def interactive_loop(agent: AgentLoop):
 
     while True:
         try:
-            user_input = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: session.prompt("\nManus > ")
-            )
+            user_input = await asyncio.to_thread(session.prompt, "\nManus > ")
             user_input = user_input.strip()
 
             if not user_input:
@@ -173,45 +275,25 @@ async def interactive_loop(agent: AgentLoop):
 
             command = user_input.lower()
 
-            if command in ("exit", "quit", "keluar"):
+            if command in EXIT_COMMANDS:
                 console.print("[yellow]Sampai jumpa![/yellow]")
                 break
-            elif command == "help":
-                display_help()
-                continue
-            elif command == "status":
-                display_status(agent)
-                continue
-            elif command == "tools":
-                display_tools(agent)
-                continue
-            elif command == "knowledge":
-                display_knowledge(agent)
-                continue
-            elif command == "history":
-                history = agent.context_manager.export_history()
-                if not history:
-                    console.print("[dim]Belum ada riwayat percakapan.[/dim]")
-                else:
-                    for msg in history[-10:]:
-                        role_color = "green" if msg["role"] == "user" else "blue"
-                        console.print(f"[{role_color}][{msg['role']}][/{role_color}]: {msg['content'][:200]}")
-                continue
-            elif command == "clear":
-                agent.context_manager.clear()
-                console.print("[green]Konteks percakapan dibersihkan.[/green]")
-                continue
-            elif command == "plan":
-                if agent.planner.tasks:
-                    console.print(agent.planner.get_plan_summary())
-                else:
-                    console.print("[dim]Belum ada rencana tugas.[/dim]")
+
+            handler = COMMAND_HANDLERS.get(command)
+            if handler:
+                handler(agent)
                 continue
 
             console.print("[bold cyan]Memproses...[/bold cyan]")
-            response = await agent.process_request(user_input)
             console.print()
-            console.print(Panel(Markdown(response), border_style="green", title="Manus"))
+            if not console.is_terminal:
+                response = await agent.process_request(user_input)
+                console.print(Panel(Markdown(response), border_style="green", title="Manus"))
+                continue
+            view = _StreamingPanel()
+            with Live(get_renderable=view, console=console, refresh_per_second=4):
+                async for chunk in agent.process_request_stream(user_input):
+                    view.append(chunk)
 
         except KeyboardInterrupt:
             console.print("\n[yellow]Tekan Ctrl+C lagi atau ketik 'exit' untuk keluar.[/yellow]")
@@ -219,6 +301,23 @@ async def interactive_loop(agent: AgentLoop):
             break
 
 
+CLI_TOOLS = (
+    ("shell_tool", "tools.shell_tool", "ShellTool"),
+    ("file_tool", "tools.file_tool", "FileTool"),
+    ("browser_tool", "tools.browser_tool", "BrowserTool"),
+    ("search_tool", "tools.search_tool", "SearchTool"),
+    ("generate_tool", "tools.generate_tool", "GenerateTool"),
+    ("slides_tool", "tools.slides_tool", "SlidesTool"),
+    ("webdev_tool", "tools.webdev_tool", "WebDevTool"),
+    ("schedule_tool", "tools.schedule_tool", "ScheduleTool"),
+    ("message_tool", "tools.message_tool", "MessageTool"),
+)
+
+
+def _build_tool(module_name: str, class_name: str):
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
 async def main():
     config = load_config()
     setup_logging(config)
@@ -226,27 +325,10 @@ async def main():
 
     agent = AgentLoop(config)
 
-    from tools.shell_tool import ShellTool
-    from tools.file_tool import FileTool
-    from tools.browser_tool import BrowserTool
-    from tools.search_tool import SearchTool
-    from tools.generate_tool import GenerateTool
-    from tools.slides_tool import SlidesTool
-    from tools.webdev_tool import WebDevTool
-    from tools.schedule_tool import ScheduleTool
-    from tools.message_tool import MessageTool
-
-    tool_instances = {
-        "shell_tool": ShellTool(),
-        "file_tool": FileTool(),
-        "browser_tool": BrowserTool(),
-        "search_tool": SearchTool(),
-        "generate_tool": GenerateTool(),
-        "slides_tool": SlidesTool(),
-        "webdev_tool": WebDevTool(),
-        "schedule_tool": ScheduleTool(),
-        "message_tool": MessageTool(),
-    }
+    instances = await asyncio.gather(
+        *(asyncio.to_thread(_build_tool, module, cls) for _, module, cls in CLI_TOOLS)
+    )
+    tool_instances = {name: instance for (name, _, _), instance in zip(CLI_TOOLS, instances)}
 
     for name, instance in tool_instances.items():
         agent.register_tool(name, instance)
@@ -261,7 +343,10 @@ async def main():
     finally:
         user_manager.save()
         await agent.cleanup()
+        await shutdown_shared_session()
         logger.info("Manus Agent dihentikan.")
+        for handler in logging.getLogger().handlers:
+            handler.flush()
 
 
 def run():
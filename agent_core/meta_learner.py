@@ -1,50 +1,111 @@
 """Meta-Learner - Modul meta-learning untuk agen belajar bagaimana belajar."""
 
-import json
+import heapq
 import logging
 import os
+import re
+import threading
 import time
 import math
-from typing import Optional
-from collections import defaultdict
+from types import MappingProxyType
+from typing import Callable, Iterable, Mapping, Optional
+from collections import Counter, defaultdict, deque
+from functools import lru_cache
+from itertools import islice
+
+from agent_core.persistence import DebouncedFlusher, atomic_write, json_dumps, json_loads, load_jsonl, write_json
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=8)
+def _build_keyword_matcher(classifier_key: tuple) -> tuple[re.Pattern, dict[str, tuple[str, ...]], dict[str, tuple[str, ...]], dict[str, str]]:
+    kw_to_cats = defaultdict(list)
+    for task_type, kws in classifier_key:
+        for kw in kws:
+            kw_to_cats[kw.lower()].append(task_type)
+    keywords = sorted(kw_to_cats, key=len, reverse=True)
+    pattern = re.compile("(?=(" + "|".join(re.escape(kw) for kw in keywords) + "))")
+    contained = {kw: tuple(other for other in keywords if other != kw and other in kw) for kw in keywords}
+    kw_best = {kw: _best_category(classifier_key, Counter(cats)) for kw, cats in kw_to_cats.items()}
+    return pattern, contained, {kw: tuple(cats) for kw, cats in kw_to_cats.items()}, kw_best
+
+
+def _best_category(classifier_key: tuple, scores: Counter) -> str:
+    best_cat, best_score = "general", 0
+    for task_type, _ in classifier_key:
+        score = scores[task_type]
+        if score > best_score:
+            best_cat, best_score = task_type, score
+    return best_cat
+
+
+def _compile_classifier(classifier_key: tuple) -> Callable[[str], str]:
+    """Kompilasi matcher sekali dan kembalikan fungsi klasifikasi dengan cache per input."""
+    pattern, contained, kw_to_cats, kw_best = _build_keyword_matcher(classifier_key)
+
+    @lru_cache(maxsize=1024)
+    def classify(user_input: str) -> str:
+        found = set()
+        for match in pattern.finditer(user_input.lower()):
+            kw = match.group(1)
+            if kw not in found:
+                found.add(kw)
+                found.update(contained[kw])
+
+        if not found:
+            return "general"
+        if len(found) == 1:
+            return kw_best[next(iter(found))]
+
+        scores = Counter()
+        for kw in found:
+            scores.update(kw_to_cats[kw])
+        return _best_category(classifier_key, scores)
+
+    return classify
+
+
 class ExecutionPattern:
+    __slots__ = ("pattern_id", "task_type", "tool_sequence", "success", "duration_ms",
+                 "feedback_score", "timestamp", "_dict_cache")
+
     def __init__(self, pattern_id: str, task_type: str, tool_sequence: list[str],
-                 success: bool, duration_ms: int, feedback_score: float = 0):
+                 success: bool, duration_ms: int, feedback_score: float = 0,
+                 timestamp: Optional[float] = None):
         self.pattern_id = pattern_id
         self.task_type = task_type
         self.tool_sequence = tool_sequence
         self.success = success
         self.duration_ms = duration_ms
         self.feedback_score = feedback_score
-        self.timestamp = time.time()
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self._dict_cache: Optional[dict] = None
 
     def to_dict(self) -> dict:
-        return {
-            "pattern_id": self.pattern_id,
-            "task_type": self.task_type,
-            "tool_sequence": self.tool_sequence,
-            "success": self.success,
-            "duration_ms": self.duration_ms,
-            "feedback_score": self.feedback_score,
-            "timestamp": self.timestamp,
-        }
+        if self._dict_cache is None:
+            self._dict_cache = {
+                "pattern_id": self.pattern_id,
+                "task_type": self.task_type,
+                "tool_sequence": self.tool_sequence,
+                "success": self.success,
+                "duration_ms": self.duration_ms,
+                "feedback_score": self.feedback_score,
+                "timestamp": self.timestamp,
+            }
+        return self._dict_cache
 
     @classmethod
     def from_dict(cls, data: dict) -> "ExecutionPattern":
-        p = cls(
+        return cls(
             pattern_id=data["pattern_id"],
             task_type=data.get("task_type", "general"),
             tool_sequence=data.get("tool_sequence", []),
             success=data.get("success", False),
             duration_ms=data.get("duration_ms", 0),
             feedback_score=data.get("feedback_score", 0),
+            timestamp=data.get("timestamp"),
         )
-        p.timestamp = data.get("timestamp", time.time())
-        return p
 
 
 class StrategyProfile:
@@ -53,57 +114,103 @@ class StrategyProfile:
         self.total_executions = 0
         self.successful_executions = 0
         self.avg_duration_ms = 0
-        self.best_tool_sequences: list[dict] = []
+        self.best_tool_sequences: dict[str, dict] = {}
         self.worst_tool_sequences: list[dict] = []
         self.preferred_tools: dict[str, float] = {}
         self.avg_iterations = 0
         self.last_updated = time.time()
+        self._cached_dict: Optional[dict] = None
+        self._cached_for: Optional[tuple[float, int]] = None
 
     def to_dict(self) -> dict:
-        return {
+        cache_key = (self.last_updated, self.total_executions)
+        if self._cached_for == cache_key:
+            return self._cached_dict
+        self._cached_dict = {
             "task_type": self.task_type,
             "total_executions": self.total_executions,
             "successful_executions": self.successful_executions,
-            "success_rate": round(self.successful_executions / self.total_executions, 4) if self.total_executions > 0 else 0,
+            "success_rate": self.successful_executions / self.total_executions if self.total_executions > 0 else 0,
             "avg_duration_ms": round(self.avg_duration_ms),
-            "best_tool_sequences": self.best_tool_sequences[:5],
+            "best_tool_sequences": self.top_sequences(5),
             "worst_tool_sequences": self.worst_tool_sequences[:3],
-            "preferred_tools": {k: round(v, 4) for k, v in sorted(self.preferred_tools.items(), key=lambda x: x[1], reverse=True)[:10]},
-            "avg_iterations": round(self.avg_iterations, 2),
+            "preferred_tools": dict(sorted(self.preferred_tools.items(), key=lambda x: x[1], reverse=True)[:10]),
+            "avg_iterations": self.avg_iterations,
             "last_updated": self.last_updated,
         }
+        self._cached_for = cache_key
+        return self._cached_dict
+
+    def top_sequences(self, n: int) -> list[dict]:
+        return heapq.nlargest(n, self.best_tool_sequences.values(), key=lambda x: x.get("score", 0))
 
 
 class PerformanceTracker:
+    max_values = 200
+    window = 20
+
     def __init__(self):
-        self.metrics: dict[str, list[float]] = defaultdict(list)
+        self.metrics: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=self.max_values))
         self.baselines: dict[str, float] = {}
         self.improvements: dict[str, float] = {}
+        self._sums: dict[str, float] = defaultdict(float)
+        self._window_sums: dict[str, float] = defaultdict(float)
+        self._seq: dict[str, int] = defaultdict(int)
+        self._mins: dict[str, deque[tuple[int, float]]] = defaultdict(deque)
+        self._maxs: dict[str, deque[tuple[int, float]]] = defaultdict(deque)
 
     def record_metric(self, name: str, value: float):
-        self.metrics[name].append(value)
-        if len(self.metrics[name]) > 200:
-            self.metrics[name] = self.metrics[name][-200:]
+        values = self.metrics[name]
+        if len(values) == values.maxlen:
+            self._sums[name] -= values[0]
+        if len(values) >= self.window:
+            self._window_sums[name] -= values[-self.window]
+        values.append(value)
+        self._sums[name] += value
+        self._window_sums[name] += value
+
+        seq = self._seq[name]
+        self._seq[name] = seq + 1
+        oldest = seq - len(values) + 1
+        mins, maxs = self._mins[name], self._maxs[name]
+        while mins and mins[-1][1] >= value:
+            mins.pop()
+        mins.append((seq, value))
+        while mins[0][0] < oldest:
+            mins.popleft()
+        while maxs and maxs[-1][1] <= value:
+            maxs.pop()
+        maxs.append((seq, value))
+        while maxs[0][0] < oldest:
+            maxs.popleft()
+
+    def load_metric(self, name: str, values):
+        for store in (self.metrics, self._sums, self._window_sums, self._seq, self._mins, self._maxs):
+            store.pop(name, None)
+        for value in values:
+            self.record_metric(name, value)
 
     def compute_baseline(self, name: str, window: int = 20) -> float:
-        values = self.metrics.get(name, [])
+        values = self.metrics.get(name, ())
         if len(values) < window:
             baseline = sum(values) / len(values) if values else 0
         else:
-            baseline = sum(values[:window]) / window
+            baseline = sum(islice(values, window)) / window
         self.baselines[name] = baseline
         return baseline
 
     def compute_improvement(self, name: str, window: int = 20) -> float:
-        values = self.metrics.get(name, [])
+        values = self.metrics.get(name, ())
         baseline = self.baselines.get(name)
         if baseline is None:
             baseline = self.compute_baseline(name, window)
 
         if len(values) < window:
-            recent = sum(values) / len(values) if values else 0
+            recent = self._sums[name] / len(values) if values else 0
+        elif window == self.window:
+            recent = self._window_sums[name] / window
         else:
-            recent = sum(values[-window:]) / window
+            recent = sum(islice(values, len(values) - window, None)) / window
 
         if baseline == 0:
             improvement = 0
@@ -118,13 +225,13 @@ class PerformanceTracker:
         for name in self.metrics:
             values = self.metrics[name]
             result[name] = {
-                "current": round(values[-1], 4) if values else 0,
-                "avg": round(sum(values) / len(values), 4) if values else 0,
-                "min": round(min(values), 4) if values else 0,
-                "max": round(max(values), 4) if values else 0,
+                "current": values[-1] if values else 0,
+                "avg": self._sums[name] / len(values) if values else 0,
+                "min": self._mins[name][0][1] if values else 0,
+                "max": self._maxs[name][0][1] if values else 0,
                 "count": len(values),
-                "baseline": round(self.baselines.get(name, 0), 4),
-                "improvement": round(self.improvements.get(name, 0), 4),
+                "baseline": self.baselines.get(name, 0),
+                "improvement": self.improvements.get(name, 0),
             }
         return result
 
@@ -132,12 +239,15 @@ class PerformanceTracker:
 class MetaLearner:
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
-        self.patterns_file = os.path.join(data_dir, "meta_patterns.json")
+        self.patterns_file = os.path.join(data_dir, "meta_patterns.jsonl")
+        self.performance_file = os.path.join(data_dir, "meta_perf.json")
+        self.legacy_patterns_file = os.path.join(data_dir, "meta_patterns.json")
         self.strategies_file = os.path.join(data_dir, "meta_strategies.json")
-        self.execution_patterns: list[ExecutionPattern] = []
+        self.max_patterns = 500
+        self.execution_patterns: deque[ExecutionPattern] = deque(maxlen=self.max_patterns)
         self.strategy_profiles: dict[str, StrategyProfile] = {}
         self.performance = PerformanceTracker()
-        self.task_type_classifier: dict[str, list[str]] = {
+        self.task_type_classifier = {
             "code": ["code", "program", "script", "function", "class", "debug", "error", "bug", "compile", "run"],
             "search": ["search", "find", "lookup", "query", "information", "what is", "how to", "explain"],
             "file": ["file", "read", "write", "create", "delete", "folder", "directory", "save", "open"],
@@ -147,35 +257,79 @@ class MetaLearner:
             "analysis": ["analyze", "analyze_file", "inspect", "review", "check", "examine", "report", "statistics"],
             "communication": ["message", "tell", "notify", "respond", "answer", "explain", "help"],
         }
-        self.max_patterns = 500
+        self._lock = threading.RLock()
+        self._pending_patterns: list[ExecutionPattern] = []
+        self._pattern_log_lines = 0
+        self._needs_compact = False
+        self._task_counts: Counter = Counter()
+        self._success_count = 0
+        self._version = 0
+        self._report_cache: Optional[tuple[int, dict]] = None
+        self._flusher = DebouncedFlusher(self._save_data, "meta-learner")
         self._load_data()
+        self._rebuild_counters()
+        if self._needs_compact:
+            self._flusher.mark_dirty()
         logger.info("Meta-Learner diinisialisasi")
 
+    @property
+    def task_type_classifier(self) -> Mapping[str, tuple[str, ...]]:
+        """Read-only; assign a new mapping to change keywords so the compiled matcher is rebuilt."""
+        return self._task_type_classifier
+
+    @task_type_classifier.setter
+    def task_type_classifier(self, classifier: Mapping[str, Iterable[str]]):
+        classifier_key = tuple((task_type, tuple(keywords)) for task_type, keywords in classifier.items())
+        self._task_type_classifier = MappingProxyType(dict(classifier_key))
+        self._classify = _compile_classifier(classifier_key)
+
     def _load_data(self):
         os.makedirs(self.data_dir, exist_ok=True)
         if os.path.exists(self.patterns_file):
             try:
-                with open(self.patterns_file, "r") as f:
-                    data = json.load(f)
-                self.execution_patterns = [ExecutionPattern.from_dict(p) for p in data.get("patterns", [])]
-                perf_data = data.get("performance", {})
-                for name, values in perf_data.get("metrics", {}).items():
-                    self.performance.metrics[name] = values
-                self.performance.baselines = perf_data.get("baselines", {})
+                patterns = self.execution_patterns
+                good, bad = load_jsonl(
+                    self.patterns_file, lambda d: patterns.append(ExecutionPattern.from_dict(d))
+                )
+                self._pattern_log_lines = good + bad
+                if bad:
+                    logger.warning(f"{bad} baris meta-pattern rusak dilewati")
+                    self._needs_compact = True
                 logger.info(f"Meta-learning data dimuat: {len(self.execution_patterns)} patterns")
             except Exception as e:
                 logger.warning(f"Gagal memuat meta-learning data: {e}")
+            if os.path.exists(self.performance_file):
+                try:
+                    with open(self.performance_file, "rb") as f:
+                        self._load_performance(json_loads(f.read()))
+                except Exception as e:
+                    logger.warning(f"Gagal memuat data performa: {e}")
+        elif os.path.exists(self.legacy_patterns_file):
+            try:
+                with open(self.legacy_patterns_file, "rb") as f:
+                    data = json_loads(f.read())
+                self.execution_patterns = deque(
+                    (ExecutionPattern.from_dict(p) for p in data.get("patterns", [])), maxlen=self.max_patterns
+                )
+                self._load_performance(data.get("performance", {}))
+                self._needs_compact = True
+                logger.info(f"Meta-learning data lama dimuat: {len(self.execution_patterns)} patterns")
+            except Exception as e:
+                logger.warning(f"Gagal memuat meta-learning data: {e}")
 
         if os.path.exists(self.strategies_file):
             try:
-                with open(self.strategies_file, "r") as f:
-                    data = json.load(f)
+                with open(self.strategies_file, "rb") as f:
+                    data = json_loads(f.read())
                 for name, sd in data.get("strategies", {}).items():
                     profile = StrategyProfile(name)
                     profile.total_executions = sd.get("total_executions", 0)
                     profile.successful_executions = sd.get("successful_executions", 0)
                     profile.avg_duration_ms = sd.get("avg_duration_ms", 0)
-                    profile.best_tool_sequences = sd.get("best_tool_sequences", [])
+                    profile.best_tool_sequences = {
+                        s.get("key") or " -> ".join(s.get("sequence", [])) or "direct": s
+                        for s in sd.get("best_tool_sequences", [])
+                    }
                     profile.worst_tool_sequences = sd.get("worst_tool_sequences", [])
                     profile.preferred_tools = sd.get("preferred_tools", {})
                     profile.avg_iterations = sd.get("avg_iterations", 0)
@@ -183,44 +337,81 @@ class MetaLearner:
             except Exception as e:
                 logger.warning(f"Gagal memuat strategy data: {e}")
 
+    def _rebuild_counters(self):
+        self._task_counts = Counter(p.task_type for p in self.execution_patterns)
+        self._success_count = sum(1 for p in self.execution_patterns if p.success)
+
+    def _load_performance(self, perf_data: dict):
+        for name, values in perf_data.get("metrics", {}).items():
+            self.performance.load_metric(name, values)
+        self.performance.baselines = perf_data.get("baselines", {})
+
     def _save_data(self):
         os.makedirs(self.data_dir, exist_ok=True)
-        patterns_data = {
-            "patterns": [p.to_dict() for p in self.execution_patterns[-self.max_patterns:]],
-            "performance": {
-                "metrics": dict(self.performance.metrics),
-                "baselines": self.performance.baselines,
-            },
-            "metadata": {"last_updated": time.time(), "total_patterns": len(self.execution_patterns)},
-        }
-        with open(self.patterns_file, "w") as f:
-            json.dump(patterns_data, f, indent=2, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            new_patterns, self._pending_patterns = self._pending_patterns, []
+            compact = self._needs_compact or self._pattern_log_lines + len(new_patterns) > 2 * self.max_patterns
+            if compact:
+                new_patterns = list(self.execution_patterns)
+                self._needs_compact = False
+            pattern_lines = [json_dumps(p.to_dict()) + "\n" for p in new_patterns]
+            performance_data = {
+                "metrics": {name: list(values) for name, values in self.performance.metrics.items()},
+                "baselines": dict(self.performance.baselines),
+                "metadata": {"last_updated": now, "total_patterns": len(self.execution_patterns)},
+            }
+            strategies_data = {
+                "strategies": {name: s.to_dict() for name, s in self.strategy_profiles.items()},
+                "metadata": {"last_updated": now},
+            }
 
-        strategies_data = {
-            "strategies": {name: s.to_dict() for name, s in self.strategy_profiles.items()},
-            "metadata": {"last_updated": time.time()},
-        }
-        with open(self.strategies_file, "w") as f:
-            json.dump(strategies_data, f, indent=2, ensure_ascii=False)
+        try:
+            if compact:
+                atomic_write(self.patterns_file, pattern_lines)
+                self._pattern_log_lines = len(pattern_lines)
+            elif pattern_lines:
+                with open(self.patterns_file, "a", encoding="utf-8") as f:
+                    f.writelines(pattern_lines)
+                self._pattern_log_lines += len(pattern_lines)
+            write_json(self.performance_file, performance_data)
+            write_json(self.strategies_file, strategies_data)
+        except Exception:
+            # Pattern yang gagal (atau setengah) tertulis diganti penulisan ulang penuh dari memori.
+            with self._lock:
+                self._needs_compact = self._needs_compact or compact or bool(pattern_lines)
+            raise
+
+    def flush(self):
+        self._flusher.flush()
 
     def classify_task(self, user_input: str) -> str:
-        input_lower = user_input.lower()
-        scores = {}
-        for task_type, keywords in self.task_type_classifier.items():
-            score = sum(1 for kw in keywords if kw in input_lower)
-            if score > 0:
-                scores[task_type] = score
-
-        if not scores:
-            return "general"
-        return max(scores, key=scores.get)
+        return self._classify(user_input)
 
     def record_execution(self, user_input: str, tool_sequence: list[str],
                          success: bool, duration_ms: int, iterations: int,
                          feedback_score: float = 0) -> dict:
         task_type = self.classify_task(user_input)
-        pattern_id = f"pat_{int(time.time())}_{len(self.execution_patterns)}"
+        now = time.time()
+        pattern_id = f"pat_{int(now)}_{len(self.execution_patterns)}"
 
+        with self._lock:
+            pattern = self._record_pattern(task_type, pattern_id, tool_sequence, success,
+                                           duration_ms, iterations, feedback_score, now)
+
+        self._flusher.mark_dirty()
+        logger.info(f"Execution pattern direkam: {pattern_id} (type={task_type}, success={success})")
+
+        return {
+            "pattern_id": pattern_id,
+            "task_type": task_type,
+            "success": success,
+            "strategy_updated": True,
+        }
+
+    def _record_pattern(self, task_type: str, pattern_id: str, tool_sequence: list[str],
+                        success: bool, duration_ms: int, iterations: int,
+                        feedback_score: float, now: float) -> ExecutionPattern:
         pattern = ExecutionPattern(
             pattern_id=pattern_id,
             task_type=task_type,
@@ -228,11 +419,20 @@ class MetaLearner:
             success=success,
             duration_ms=duration_ms,
             feedback_score=feedback_score,
+            timestamp=now,
         )
-        self.execution_patterns.append(pattern)
+        if len(self.execution_patterns) == self.execution_patterns.maxlen:
+            old = self.execution_patterns[0]
+            self._task_counts[old.task_type] -= 1
+            if not self._task_counts[old.task_type]:
+                del self._task_counts[old.task_type]
+            self._success_count -= old.success
 
-        if len(self.execution_patterns) > self.max_patterns:
-            self.execution_patterns = self.execution_patterns[-self.max_patterns:]
+        self.execution_patterns.append(pattern)
+        self._pending_patterns.append(pattern)
+        self._task_counts[task_type] += 1
+        self._success_count += success
+        self._version += 1
 
         self._update_strategy(task_type, pattern, iterations)
 
@@ -240,16 +440,7 @@ class MetaLearner:
         self.performance.record_metric("duration_ms", duration_ms)
         self.performance.record_metric("iterations", iterations)
         self.performance.record_metric(f"{task_type}_success", 1.0 if success else 0.0)
-
-        self._save_data()
-        logger.info(f"Execution pattern direkam: {pattern_id} (type={task_type}, success={success})")
-
-        return {
-            "pattern_id": pattern_id,
-            "task_type": task_type,
-            "success": success,
-            "strategy_updated": True,
-        }
+        return pattern
 
     def _update_strategy(self, task_type: str, pattern: ExecutionPattern, iterations: int):
         if task_type not in self.strategy_profiles:
@@ -275,24 +466,25 @@ class MetaLearner:
         }
 
         if pattern.success:
-            existing = next((s for s in profile.best_tool_sequences if s["key"] == seq_key), None)
+            existing = profile.best_tool_sequences.get(seq_key)
             if existing:
                 existing["score"] = (existing.get("score", 0) + pattern.feedback_score) / 2
             else:
-                profile.best_tool_sequences.append(seq_entry)
-            profile.best_tool_sequences.sort(key=lambda x: x.get("score", 0), reverse=True)
-            profile.best_tool_sequences = profile.best_tool_sequences[:10]
+                profile.best_tool_sequences[seq_key] = seq_entry
+                if len(profile.best_tool_sequences) > 10:
+                    weakest, _ = min(reversed(profile.best_tool_sequences.items()), key=lambda x: x[1].get("score", 0))
+                    del profile.best_tool_sequences[weakest]
         else:
             profile.worst_tool_sequences.append(seq_entry)
             profile.worst_tool_sequences = profile.worst_tool_sequences[-5:]
 
-        for tool in pattern.tool_sequence:
-            if tool not in profile.preferred_tools:
-                profile.preferred_tools[tool] = 0.0
-            reward = 0.3 if pattern.success else -0.1
-            profile.preferred_tools[tool] = (1 - alpha) * profile.preferred_tools[tool] + alpha * reward
+        reward = 0.3 if pattern.success else -0.1
+        preferred = profile.preferred_tools
+        for tool, count in Counter(pattern.tool_sequence).items():
+            keep = (1 - alpha) ** count
+            preferred[tool] = keep * preferred.get(tool, 0.0) + (1 - keep) * reward
 
-        profile.last_updated = time.time()
+        profile.last_updated = pattern.timestamp
 
     def get_strategy_for_task(self, user_input: str) -> dict:
         task_type = self.classify_task(user_input)
@@ -313,14 +505,14 @@ class MetaLearner:
             reverse=True,
         )[:5]
 
-        best_seq = profile.best_tool_sequences[0] if profile.best_tool_sequences else None
+        best_seq = next(iter(profile.top_sequences(1)), None)
 
         return {
             "task_type": task_type,
             "has_strategy": True,
-            "success_rate": round(profile.successful_executions / profile.total_executions, 4),
+            "success_rate": profile.successful_executions / profile.total_executions,
             "avg_duration_ms": round(profile.avg_duration_ms),
-            "recommended_tools": [{"tool": t, "score": round(s, 4)} for t, s in recommended_tools],
+            "recommended_tools": [{"tool": t, "score": s} for t, s in recommended_tools],
             "best_sequence": best_seq.get("sequence", []) if best_seq else [],
             "estimated_iterations": round(profile.avg_iterations),
             "total_experience": profile.total_executions,
@@ -334,7 +526,7 @@ class MetaLearner:
             return f"Strategi untuk '{profile.task_type}' sangat efektif (success rate: {rate:.0%}). Ikuti pola yang sama."
         elif rate > 0.5:
             if profile.best_tool_sequences:
-                best = profile.best_tool_sequences[0]
+                best = profile.top_sequences(1)[0]
                 return f"Coba gunakan urutan tool: {' -> '.join(best.get('sequence', []))} untuk hasil lebih baik."
             return f"Strategi cukup efektif ({rate:.0%}). Evaluasi tool yang kurang optimal."
         else:
@@ -344,25 +536,27 @@ class MetaLearner:
             return f"Performa rendah ({rate:.0%}). Pertimbangkan pendekatan alternatif."
 
     def get_performance_report(self) -> dict:
+        if self._report_cache is not None and self._report_cache[0] == self._version:
+            return dict(self._report_cache[1])
+
         for metric in self.performance.metrics:
             self.performance.compute_improvement(metric)
 
-        return {
+        report = {
             "metrics": self.performance.to_dict(),
             "strategy_profiles": {name: s.to_dict() for name, s in self.strategy_profiles.items()},
             "total_patterns": len(self.execution_patterns),
             "task_type_distribution": self._get_task_distribution(),
             "overall_improvement": self._compute_overall_improvement(),
         }
+        self._report_cache = (self._version, report)
+        return dict(report)
 
     def _get_task_distribution(self) -> dict:
-        distribution = defaultdict(int)
-        for p in self.execution_patterns:
-            distribution[p.task_type] += 1
         total = len(self.execution_patterns)
         return {
             k: {"count": v, "percentage": round(v / total * 100, 1) if total > 0 else 0}
-            for k, v in sorted(distribution.items(), key=lambda x: x[1], reverse=True)
+            for k, v in sorted(self._task_counts.items(), key=lambda x: x[1], reverse=True)
         }
 
     def _compute_overall_improvement(self) -> dict:
@@ -397,7 +591,7 @@ class MetaLearner:
                 "strategies_count": 0,
             }
 
-        success_patterns = sum(1 for p in self.execution_patterns if p.success)
+        success_patterns = self._success_count
 
         return {
             "status": "active",
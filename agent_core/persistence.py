@@ -0,0 +1,147 @@
+"""Persistence - Helper bersama untuk serialisasi JSON, penulisan file atomik, dan flush tertunda."""
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# mkstemp selalu membuat file 0600; file baru diberi mode default yang mengikuti umask proses.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def json_dumps(data, indent: bool = False, non_str_keys: bool = False) -> str:
+    if orjson is not None:
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_NON_STR_KEYS if non_str_keys else 0)
+        return orjson.dumps(data, option=option).decode("utf-8")
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False)
+
+
+json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def atomic_write(path: str, lines: Iterable[str]):
+    """Tulis ke file sementara di direktori yang sama lalu ganti target dengan os.replace.
+
+    Mode file target yang sudah ada dipertahankan; file baru mengikuti umask.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_json(path: str, data) -> None:
+    atomic_write(path, [json_dumps(data, indent=True)])
+
+
+def load_jsonl(path: str, on_record: Callable[[dict], None]) -> tuple[int, int]:
+    """Baca log JSONL baris per baris dan kembalikan ``(baris_valid, baris_rusak)``.
+
+    Hanya baris yang gagal di-decode yang dihitung rusak. Exception dari
+    ``on_record`` (misalnya perubahan skema) dicatat terpisah dan barisnya tetap
+    dihitung valid, sehingga pemanggil tidak memadatkan log dan menghapus riwayat.
+    Baris terakhir tanpa newline (sisa penulisan yang terputus) dipotong bila
+    rusak, atau ditutup dengan newline bila valid, agar append berikutnya aman.
+    """
+    good = bad = rejected = 0
+    offset = tail_start = 0
+    tail_ok = True
+    with open(path, "rb") as f:
+        for raw in f:
+            tail_start, offset = offset, offset + len(raw)
+            if not raw.strip():
+                tail_ok = True
+                continue
+            try:
+                record = json_loads(raw)
+            except ValueError:
+                bad += 1
+                tail_ok = False
+                continue
+            good += 1
+            tail_ok = True
+            try:
+                on_record(record)
+            except Exception:
+                rejected += 1
+                if rejected == 1:
+                    logger.exception(f"Record di {path} gagal dimuat")
+    if rejected:
+        logger.warning(f"{rejected} record valid di {path} gagal dimuat dan dilewati")
+    if offset and not raw.endswith(b"\n"):
+        with open(path, "r+b") as f:
+            if tail_ok:
+                f.seek(offset)
+                f.write(b"\n")
+            else:
+                f.truncate(tail_start)
+        logger.warning(f"Baris terakhir {path} tidak lengkap, log diperbaiki")
+    return good, bad
+
+
+class DebouncedFlusher:
+    """Simpan data di thread latar belakang paling lambat ``delay`` detik setelah ditandai kotor.
+
+    Thread daemon hanya dibuat saat ada perubahan; ``flush()`` juga didaftarkan
+    ke atexit sehingga perubahan terakhir tetap tersimpan saat proses berhenti.
+    Bila ``save`` gagal, data ditandai kotor lagi agar dicoba ulang pada tick berikutnya;
+    ``save`` sendiri harus mengembalikan antrean yang belum tertulis.
+    """
+
+    def __init__(self, save: Callable[[], None], name: str, delay: float = 0.5):
+        self.save = save
+        self.name = name
+        self.delay = delay
+        self._dirty = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        atexit.register(self.flush)
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty.is_set()
+
+    def mark_dirty(self):
+        self._dirty.set()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, name=f"{self.name}-flush", daemon=True)
+            self._thread.start()
+
+    def _worker(self):
+        while True:
+            self._dirty.wait()
+            time.sleep(self.delay)
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            if not self._dirty.is_set():
+                return
+            self._dirty.clear()
+            try:
+                self.save()
+            except Exception as e:
+                self._dirty.set()
+                logger.warning(f"Gagal menyimpan data {self.name}, dicoba ulang: {e}")
@@ -1,8 +1,11 @@
 """Planner - Modul untuk membuat dan memperbarui rencana tugas dengan optimasi meta-learning."""
 
+import bisect
 import logging
 import time
+from collections import deque
 from enum import Enum
+from operator import attrgetter
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -17,6 +20,9 @@ class TaskStatus(Enum):
 
 
 class Task:
+    __slots__ = ("task_id", "description", "priority", "status", "subtasks", "result",
+                 "created_at", "updated_at", "metadata", "tools_used", "duration_ms")
+
     def __init__(self, task_id: str, description: str, priority: int = 5):
         self.task_id = task_id
         self.description = description
@@ -24,8 +30,7 @@ class Task:
         self.status = TaskStatus.PENDING
         self.subtasks: list["Task"] = []
         self.result: Optional[str] = None
-        self.created_at = time.time()
-        self.updated_at = time.time()
+        self.created_at = self.updated_at = time.time()
         self.metadata: dict = {}
         self.tools_used: list[str] = []
         self.duration_ms: int = 0
@@ -49,6 +54,11 @@ class Planner:
     def __init__(self, meta_learner=None):
         self.tasks: list[Task] = []
         self._task_counter = 0
+        self._by_id: dict[str, Task] = {}
+        self._pending: deque[Task] = deque()
+        self._pending_stale = False
+        self._stats_version = 0
+        self._stats_cache: Optional[tuple[int, dict]] = None
         self.meta_learner = meta_learner
 
     def set_meta_learner(self, meta_learner):
@@ -56,6 +66,7 @@ class Planner:
 
     def create_plan(self, goal: str, steps: list[str]) -> list[Task]:
         self.tasks.clear()
+        self._by_id.clear()
         self._task_counter = 0
         for step in steps:
             self._task_counter += 1
@@ -65,6 +76,10 @@ class Planner:
                 priority=self._task_counter,
             )
             self.tasks.append(task)
+            self._by_id[task.task_id] = task
+        self._pending = deque(self.tasks)
+        self._pending_stale = False
+        self._stats_version += 1
         logger.info(f"Rencana dibuat untuk '{goal}' dengan {len(steps)} langkah.")
         return self.tasks
 
@@ -91,8 +106,10 @@ class Planner:
             description=description,
             priority=priority,
         )
-        self.tasks.append(task)
-        self.tasks.sort(key=lambda t: t.priority)
+        bisect.insort(self.tasks, task, key=attrgetter("priority"))
+        self._by_id[task.task_id] = task
+        self._pending_stale = True
+        self._stats_version += 1
         logger.info(f"Tugas ditambahkan: {description}")
         return task
 
@@ -107,16 +124,13 @@ class Planner:
             description=description,
         )
         parent.subtasks.append(subtask)
+        self._by_id[subtask.task_id] = subtask
+        self._pending_stale = True
+        self._stats_version += 1
         return subtask
 
     def get_task(self, task_id: str) -> Optional[Task]:
-        for task in self.tasks:
-            if task.task_id == task_id:
-                return task
-            for sub in task.subtasks:
-                if sub.task_id == task_id:
-                    return sub
-        return None
+        return self._by_id.get(task_id)
 
     def update_task_status(self, task_id: str, status: TaskStatus, result: Optional[str] = None):
         task = self.get_task(task_id)
@@ -126,60 +140,57 @@ class Planner:
             task.updated_at = time.time()
             if status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
                 task.duration_ms = int((task.updated_at - task.created_at) * 1000)
+            elif status == TaskStatus.PENDING:
+                self._pending_stale = True
+            self._stats_version += 1
             logger.info(f"Tugas '{task_id}' diperbarui ke {status.value}")
 
     def get_next_task(self) -> Optional[Task]:
-        for task in self.tasks:
-            if task.status == TaskStatus.PENDING:
-                return task
-            for sub in task.subtasks:
-                if sub.status == TaskStatus.PENDING:
-                    return sub
-        return None
+        if self._pending_stale:
+            self._pending = deque(t for task in self.tasks for t in (task, *task.subtasks))
+            self._pending_stale = False
+        while self._pending and self._pending[0].status != TaskStatus.PENDING:
+            self._pending.popleft()
+        return self._pending[0] if self._pending else None
+
+    def _compute_stats(self) -> dict:
+        if self._stats_cache is not None and self._stats_cache[0] == self._stats_version:
+            return self._stats_cache[1]
 
-    def get_progress(self) -> dict:
         total = 0
         completed = 0
         failed = 0
+        total_duration = 0
+        tool_counts = {}
         for task in self.tasks:
-            total += 1
-            if task.status == TaskStatus.COMPLETED:
-                completed += 1
-            elif task.status == TaskStatus.FAILED:
-                failed += 1
-            for sub in task.subtasks:
+            for t in (task, *task.subtasks):
                 total += 1
-                if sub.status == TaskStatus.COMPLETED:
+                if t.status == TaskStatus.COMPLETED:
                     completed += 1
-                elif sub.status == TaskStatus.FAILED:
+                elif t.status == TaskStatus.FAILED:
                     failed += 1
-        return {
+                total_duration += t.duration_ms
+                for tool in t.tools_used:
+                    tool_counts[tool] = tool_counts.get(tool, 0) + 1
+
+        stats = {
             "total": total,
             "completed": completed,
             "failed": failed,
             "percentage": (completed / total * 100) if total > 0 else 0,
-        }
-
-    def get_execution_stats(self) -> dict:
-        all_tools = []
-        total_duration = 0
-        for task in self.tasks:
-            all_tools.extend(task.tools_used)
-            total_duration += task.duration_ms
-            for sub in task.subtasks:
-                all_tools.extend(sub.tools_used)
-                total_duration += sub.duration_ms
-
-        tool_counts = {}
-        for tool in all_tools:
-            tool_counts[tool] = tool_counts.get(tool, 0) + 1
-
-        progress = self.get_progress()
-        return {
-            **progress,
             "tools_used": tool_counts,
             "total_duration_ms": total_duration,
         }
+        self._stats_cache = (self._stats_version, stats)
+        return stats
+
+    def get_progress(self) -> dict:
+        stats = self._compute_stats()
+        return {key: stats[key] for key in ("total", "completed", "failed", "percentage")}
+
+    def get_execution_stats(self) -> dict:
+        stats = self._compute_stats()
+        return {**stats, "tools_used": dict(stats["tools_used"])}
 
     def get_plan_summary(self) -> str:
         lines = ["=== Rencana Tugas ==="]
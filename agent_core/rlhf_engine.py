@@ -1,13 +1,19 @@
 """RLHF Engine - Reinforcement Learning from Human Feedback untuk Manus Agent."""
 
-import json
+import heapq
 import logging
 import os
+import threading
 import time
 import math
+from itertools import count, islice
+from operator import attrgetter, itemgetter
 from typing import Optional
+from collections import Counter, defaultdict, deque
 from enum import Enum
 
+from agent_core.persistence import DebouncedFlusher, json_dumps, json_loads, load_jsonl, write_json
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,7 +25,15 @@ class FeedbackType(Enum):
     PREFERENCE = "preference"
 
 
+_FB_LOOKUP = {m.value: m for m in FeedbackType}
+_FB_FORCED_VALUE = {FeedbackType.THUMBS_UP: 1.0, FeedbackType.THUMBS_DOWN: -1.0}
+_get_value = attrgetter("value")
+
+
 class FeedbackEntry:
+    __slots__ = ("feedback_id", "session_id", "message_id", "feedback_type", "value",
+                 "context", "comment", "created_at")
+
     def __init__(self, feedback_id: str, session_id: str, message_id: str,
                  feedback_type: FeedbackType, value: float, context: dict = None,
                  comment: str = ""):
@@ -58,8 +72,26 @@ class FeedbackEntry:
         entry.created_at = data.get("created_at", time.time())
         return entry
 
+    @classmethod
+    def from_saved(cls, data: dict) -> "FeedbackEntry":
+        try:
+            entry = cls.__new__(cls)
+            entry.feedback_id = data["feedback_id"]
+            entry.session_id = data["session_id"]
+            entry.message_id = data["message_id"]
+            entry.feedback_type = _FB_LOOKUP[data["feedback_type"]]
+            entry.value = data["value"]
+            entry.context = data["context"]
+            entry.comment = data["comment"]
+            entry.created_at = data["created_at"]
+            return entry
+        except KeyError:
+            return cls.from_dict(data)
+
 
 class RewardSignal:
+    __slots__ = ("tool_name", "action_context", "reward", "timestamp")
+
     def __init__(self, tool_name: str, action_context: str, reward: float,
                  timestamp: float = None):
         self.tool_name = tool_name
@@ -75,8 +107,17 @@ class RewardSignal:
             "timestamp": self.timestamp,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "RewardSignal":
+        return cls(data["tool_name"], data["action_context"], data["reward"], data.get("timestamp", 0))
+
 
 class ToolPolicy:
+    __slots__ = ("tool_name", "total_reward", "usage_count", "success_count", "fail_count",
+                 "avg_reward", "confidence", "_ctx_keys", "_ctx_vals", "_success_rate", "_dict_cache")
+    _CTX_ALPHA = 0.3
+    _CTX_KEEP = 1 - _CTX_ALPHA
+
     def __init__(self, tool_name: str):
         self.tool_name = tool_name
         self.total_reward = 0.0
@@ -85,133 +126,297 @@ class ToolPolicy:
         self.fail_count = 0
         self.avg_reward = 0.0
         self.confidence = 0.0
-        self.context_rewards: dict[str, float] = {}
+        self._ctx_keys: list[str] = []
+        self._ctx_vals: list[float] = []
+        self._success_rate = 0.0
+        self._dict_cache: Optional[dict] = None
 
-    def update(self, reward: float, context: str = "general"):
-        self.usage_count += 1
-        self.total_reward += reward
-        if reward > 0:
-            self.success_count += 1
-        elif reward < 0:
-            self.fail_count += 1
-        self.avg_reward = self.total_reward / self.usage_count if self.usage_count > 0 else 0
+    @classmethod
+    def from_dict(cls, name: str, data: dict) -> "ToolPolicy":
+        policy = cls(name)
+        policy.total_reward = data.get("total_reward", 0)
+        policy.usage_count = data.get("usage_count", 0)
+        policy.success_count = data.get("success_count", 0)
+        policy.fail_count = data.get("fail_count", 0)
+        policy.avg_reward = data.get("avg_reward", 0)
+        policy.confidence = data.get("confidence", 0)
+        policy.context_rewards = data.get("context_rewards", {})
+        policy._success_rate = policy.success_count / policy.usage_count if policy.usage_count > 0 else 0
+        return policy
+
+    @property
+    def success_rate(self) -> float:
+        return self._success_rate
+
+    @property
+    def context_rewards(self) -> dict[str, float]:
+        return dict(zip(self._ctx_keys, self._ctx_vals))
+
+    @context_rewards.setter
+    def context_rewards(self, rewards: dict[str, float]):
+        self._ctx_keys = list(rewards)
+        self._ctx_vals = list(rewards.values())
+        self._dict_cache = None
+
+    def best_context(self) -> tuple[str, float]:
+        if not self._ctx_vals:
+            return "", 0
+        i = max(range(len(self._ctx_vals)), key=self._ctx_vals.__getitem__)
+        return self._ctx_keys[i], self._ctx_vals[i]
+
+    def worst_context(self) -> tuple[str, float]:
+        if not self._ctx_vals:
+            return "", 0
+        i = min(range(len(self._ctx_vals)), key=self._ctx_vals.__getitem__)
+        return self._ctx_keys[i], self._ctx_vals[i]
 
-        self.confidence = min(1.0, self.usage_count / 50.0)
+    def update(self, reward: float, context: str = "general"):
+        usage = self.usage_count + 1
+        total = self.total_reward + reward
+        success = self.success_count + (reward > 0)
+        self.usage_count = usage
+        self.total_reward = total
+        self.success_count = success
+        self.fail_count += reward < 0
+        self.avg_reward = total / usage
+        self.confidence = usage / 50.0 if usage < 50 else 1.0
+        self._success_rate = success / usage
 
-        if context not in self.context_rewards:
-            self.context_rewards[context] = 0.0
-        alpha = 0.3
-        self.context_rewards[context] = (1 - alpha) * self.context_rewards[context] + alpha * reward
+        try:
+            i = self._ctx_keys.index(context)
+            self._ctx_vals[i] = self._CTX_KEEP * self._ctx_vals[i] + self._CTX_ALPHA * reward
+        except ValueError:
+            self._ctx_keys.append(context)
+            self._ctx_vals.append(self._CTX_ALPHA * reward)
+        self._dict_cache = None
 
     def get_context_score(self, context: str) -> float:
-        if context in self.context_rewards:
-            return self.context_rewards[context]
-        return self.avg_reward
+        try:
+            return self._ctx_vals[self._ctx_keys.index(context)]
+        except ValueError:
+            return self.avg_reward
 
     def to_dict(self) -> dict:
-        return {
+        if self._dict_cache is not None:
+            return self._dict_cache
+        self._dict_cache = {
             "tool_name": self.tool_name,
-            "total_reward": round(self.total_reward, 4),
+            "total_reward": self.total_reward,
             "usage_count": self.usage_count,
             "success_count": self.success_count,
             "fail_count": self.fail_count,
-            "avg_reward": round(self.avg_reward, 4),
-            "confidence": round(self.confidence, 4),
-            "success_rate": round(self.success_count / self.usage_count, 4) if self.usage_count > 0 else 0,
-            "context_rewards": {k: round(v, 4) for k, v in self.context_rewards.items()},
+            "avg_reward": self.avg_reward,
+            "confidence": self.confidence,
+            "success_rate": self._success_rate,
+            "context_rewards": self.context_rewards,
         }
+        return self._dict_cache
 
 
 class RLHFEngine:
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
         self.feedback_file = os.path.join(data_dir, "rlhf_feedback.json")
+        self.feedback_log_file = os.path.join(data_dir, "rlhf_feedback.jsonl")
         self.policy_file = os.path.join(data_dir, "rlhf_policy.json")
-        self.feedback_history: list[FeedbackEntry] = []
-        self.reward_history: list[RewardSignal] = []
+        self.max_history = 500
+        self.feedback_history: deque[FeedbackEntry] = deque(maxlen=self.max_history)
+        self.reward_history: deque[RewardSignal] = deque(maxlen=self.max_history)
         self.tool_policies: dict[str, ToolPolicy] = {}
-        self.response_quality_scores: list[dict] = []
+        self.response_quality_scores: deque[dict] = deque(maxlen=self.max_history)
         self.learning_rate = 0.1
         self.discount_factor = 0.95
         self.exploration_rate = 0.15
-        self.max_history = 500
+        self._lock = threading.RLock()
+        self._pending_records: list[dict] = []
+        self._policy_cache: dict[str, dict] = {}
+        self._dirty_policies: dict[str, None] = {}
+        self._policies_reset = False
+        self._log_lines = 0
+        self._needs_compact = False
+        self._policy_version = 0
+        self._feedback_version = 0
+        self._insights_cache: Optional[tuple[tuple[int, int], dict]] = None
+        self._pos_count = 0
+        self._neg_count = 0
+        self._value_sum = 0.0
+        self._recent_values: deque[float] = deque(maxlen=40)
+        self._recent_sum = 0.0
+        self._older_sum = 0.0
+        self._by_task: dict[str, deque[FeedbackEntry]] = defaultdict(lambda: deque(maxlen=100))
+        self._flusher = DebouncedFlusher(self._save_data, "rlhf")
         self._load_data()
+        self._rebuild_feedback_stats()
+        self._id_prefix = f"fb_{int(time.time())}_"
+        self._id_counter = count(len(self.feedback_history))
+        if self._needs_compact:
+            self._flusher.mark_dirty()
         logger.info("RLHF Engine diinisialisasi")
 
     def _load_data(self):
         os.makedirs(self.data_dir, exist_ok=True)
         if os.path.exists(self.feedback_file):
             try:
-                with open(self.feedback_file, "r") as f:
-                    data = json.load(f)
-                self.feedback_history = [FeedbackEntry.from_dict(d) for d in data.get("feedback", [])]
-                self.reward_history = [
-                    RewardSignal(r["tool_name"], r["action_context"], r["reward"], r.get("timestamp", 0))
-                    for r in data.get("rewards", [])
-                ]
-                self.response_quality_scores = data.get("quality_scores", [])
-                logger.info(f"RLHF data dimuat: {len(self.feedback_history)} feedback, {len(self.reward_history)} rewards")
+                with open(self.feedback_file, "rb") as f:
+                    data = json_loads(f.read())
+                self.feedback_history = deque(
+                    map(FeedbackEntry.from_saved, data.get("feedback", [])), maxlen=self.max_history
+                )
+                self.reward_history = deque(
+                    (RewardSignal.from_dict(r) for r in data.get("rewards", [])), maxlen=self.max_history
+                )
+                self.response_quality_scores = deque(data.get("quality_scores", []), maxlen=self.max_history)
             except Exception as e:
                 logger.warning(f"Gagal memuat RLHF data: {e}")
 
+        if os.path.exists(self.feedback_log_file):
+            try:
+                good, bad = load_jsonl(self.feedback_log_file, self._replay_record)
+                self._log_lines = good + bad
+                if bad:
+                    logger.warning(f"{bad} baris log RLHF rusak dilewati")
+                    self._needs_compact = True
+            except Exception as e:
+                logger.warning(f"Gagal memuat log RLHF: {e}")
+
+        if self.feedback_history or self.reward_history:
+            logger.info(f"RLHF data dimuat: {len(self.feedback_history)} feedback, {len(self.reward_history)} rewards")
+
         if os.path.exists(self.policy_file):
             try:
-                with open(self.policy_file, "r") as f:
-                    policy_data = json.load(f)
+                with open(self.policy_file, "rb") as f:
+                    policy_data = json_loads(f.read())
                 for name, pd in policy_data.get("policies", {}).items():
-                    policy = ToolPolicy(name)
-                    policy.total_reward = pd.get("total_reward", 0)
-                    policy.usage_count = pd.get("usage_count", 0)
-                    policy.success_count = pd.get("success_count", 0)
-                    policy.fail_count = pd.get("fail_count", 0)
-                    policy.avg_reward = pd.get("avg_reward", 0)
-                    policy.confidence = pd.get("confidence", 0)
-                    policy.context_rewards = pd.get("context_rewards", {})
-                    self.tool_policies[name] = policy
+                    self.tool_policies[name] = ToolPolicy.from_dict(name, pd)
+                    self._policy_cache[name] = self.tool_policies[name].to_dict()
             except Exception as e:
                 logger.warning(f"Gagal memuat policy data: {e}")
 
+    def _replay_record(self, record: dict):
+        kind, data = record["t"], record["d"]
+        if kind == "fb":
+            self.feedback_history.append(FeedbackEntry.from_saved(data))
+        elif kind == "rw":
+            self.reward_history.append(RewardSignal.from_dict(data))
+        elif kind == "qs":
+            self.response_quality_scores.append(data)
+
+    def _rebuild_feedback_stats(self):
+        self._pos_count = 0
+        self._neg_count = 0
+        self._value_sum = 0.0
+        self._recent_values.clear()
+        self._recent_sum = 0.0
+        self._older_sum = 0.0
+        self._by_task.clear()
+        for f in self.feedback_history:
+            self._track_feedback(f.value)
+            self._index_feedback(f)
+
+    def _index_feedback(self, entry: FeedbackEntry):
+        task_type = entry.context.get("task_type")
+        if task_type and isinstance(task_type, str):
+            self._by_task[task_type].append(entry)
+
+    def _untrack_feedback(self, value: float):
+        self._pos_count -= value > 0
+        self._neg_count -= value < 0
+        self._value_sum -= value
+
+    def _track_feedback(self, value: float):
+        self._pos_count += value > 0
+        self._neg_count += value < 0
+        self._value_sum += value
+        recent = self._recent_values
+        if len(recent) >= 20:
+            shifted = recent[-20]
+            self._recent_sum -= shifted
+            self._older_sum += shifted
+        if len(recent) == recent.maxlen:
+            self._older_sum -= recent[0]
+        recent.append(value)
+        self._recent_sum += value
+
     def _save_data(self):
         os.makedirs(self.data_dir, exist_ok=True)
-        feedback_data = {
-            "feedback": [f.to_dict() for f in self.feedback_history[-self.max_history:]],
-            "rewards": [r.to_dict() for r in self.reward_history[-self.max_history:]],
-            "quality_scores": self.response_quality_scores[-self.max_history:],
+        with self._lock:
+            records, self._pending_records = self._pending_records, []
+            compact = self._needs_compact or self._log_lines + len(records) > 2 * self.max_history
+            feedback_data = self._feedback_snapshot() if compact else None
+            lines = [] if compact else [json_dumps(r) + "\n" for r in records]
+            policy_data = self._policy_snapshot()
+
+        try:
+            if feedback_data is not None:
+                self._write_feedback(feedback_data)
+            elif lines:
+                with open(self.feedback_log_file, "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+                self._log_lines += len(lines)
+            if policy_data is not None:
+                write_json(self.policy_file, policy_data)
+        except Exception:
+            # Snapshot dari memori menggantikan record yang gagal (atau setengah) tertulis.
+            with self._lock:
+                self._needs_compact = self._needs_compact or feedback_data is not None or bool(lines)
+                self._policies_reset = self._policies_reset or policy_data is not None
+            raise
+
+    def _policy_snapshot(self) -> Optional[dict]:
+        if not self._dirty_policies and not self._policies_reset:
+            return None
+        for name in self._dirty_policies:
+            policy = self.tool_policies.get(name)
+            if policy is not None:
+                self._policy_cache[name] = policy.to_dict()
+            else:
+                self._policy_cache.pop(name, None)
+        self._dirty_policies.clear()
+        self._policies_reset = False
+        return {
+            "policies": dict(self._policy_cache),
             "metadata": {
                 "last_updated": time.time(),
-                "total_feedback": len(self.feedback_history),
-                "total_rewards": len(self.reward_history),
+                "learning_rate": self.learning_rate,
+                "exploration_rate": self.exploration_rate,
             },
         }
-        with open(self.feedback_file, "w") as f:
-            json.dump(feedback_data, f, indent=2, ensure_ascii=False)
 
-        policy_data = {
-            "policies": {name: p.to_dict() for name, p in self.tool_policies.items()},
+    def _feedback_snapshot(self) -> dict:
+        self._needs_compact = False
+        return {
+            "feedback": [f.to_dict() for f in self.feedback_history],
+            "rewards": [r.to_dict() for r in self.reward_history],
+            "quality_scores": list(self.response_quality_scores),
             "metadata": {
                 "last_updated": time.time(),
-                "learning_rate": self.learning_rate,
-                "exploration_rate": self.exploration_rate,
+                "total_feedback": len(self.feedback_history),
+                "total_rewards": len(self.reward_history),
             },
         }
-        with open(self.policy_file, "w") as f:
-            json.dump(policy_data, f, indent=2, ensure_ascii=False)
+
+    def compact(self):
+        with self._lock:
+            self._needs_compact = True
+        self._flusher.mark_dirty()
+        self._flusher.flush()
+
+    def _write_feedback(self, feedback_data: dict):
+        write_json(self.feedback_file, feedback_data)
+        if os.path.exists(self.feedback_log_file):
+            os.unlink(self.feedback_log_file)
+        self._log_lines = 0
+
+    def flush(self):
+        self._flusher.flush()
 
     def record_feedback(self, session_id: str, message_id: str,
                         feedback_type: str, value: float,
                         context: dict = None, comment: str = "") -> dict:
-        feedback_id = f"fb_{int(time.time())}_{len(self.feedback_history)}"
-        try:
-            fb_type = FeedbackType(feedback_type)
-        except ValueError:
-            fb_type = FeedbackType.RATING
-
-        if fb_type == FeedbackType.THUMBS_UP:
-            value = 1.0
-        elif fb_type == FeedbackType.THUMBS_DOWN:
-            value = -1.0
-        else:
-            value = max(-1.0, min(1.0, value))
+        feedback_id = f"{self._id_prefix}{next(self._id_counter)}"
+        fb_type = _FB_LOOKUP.get(feedback_type, FeedbackType.RATING)
+        forced = _FB_FORCED_VALUE.get(fb_type)
+        value = forced if forced is not None else max(-1.0, min(1.0, value))
 
         entry = FeedbackEntry(
             feedback_id=feedback_id,
@@ -222,14 +427,21 @@ class RLHFEngine:
             context=context or {},
             comment=comment,
         )
-        self.feedback_history.append(entry)
-
-        if context and "tools_used" in context:
-            for tool_name in context["tools_used"]:
-                self._update_tool_reward(tool_name, value, context.get("action_type", "general"))
-
-        self._update_quality_score(session_id, message_id, value)
-        self._save_data()
+        with self._lock:
+            if len(self.feedback_history) == self.feedback_history.maxlen:
+                self._untrack_feedback(self.feedback_history[0].value)
+            self.feedback_history.append(entry)
+            self._track_feedback(value)
+            self._index_feedback(entry)
+            self._feedback_version += 1
+            self._pending_records.append({"t": "fb", "d": entry.to_dict()})
+
+            if context and "tools_used" in context:
+                for tool_name in context["tools_used"]:
+                    self._update_tool_reward(tool_name, value, context.get("action_type", "general"))
+
+            self._update_quality_score(session_id, message_id, value)
+        self._flusher.mark_dirty()
 
         logger.info(f"Feedback direkam: {feedback_id} ({fb_type.value}: {value})")
         return {"feedback_id": feedback_id, "status": "recorded", "value": value}
@@ -248,9 +460,11 @@ class RLHFEngine:
         total_reward = base_reward + speed_bonus
 
         signal = RewardSignal(tool_name, context, total_reward)
-        self.reward_history.append(signal)
-        self._update_tool_reward(tool_name, total_reward, context)
-        self._save_data()
+        with self._lock:
+            self.reward_history.append(signal)
+            self._pending_records.append({"t": "rw", "d": signal.to_dict()})
+            self._update_tool_reward(tool_name, total_reward, context)
+        self._flusher.mark_dirty()
 
         return {
             "tool": tool_name,
@@ -262,16 +476,21 @@ class RLHFEngine:
         if tool_name not in self.tool_policies:
             self.tool_policies[tool_name] = ToolPolicy(tool_name)
         self.tool_policies[tool_name].update(reward, context)
+        self._dirty_policies[tool_name] = None
+        self._policy_version += 1
 
     def _update_quality_score(self, session_id: str, message_id: str, score: float):
-        self.response_quality_scores.append({
+        quality = {
             "session_id": session_id,
             "message_id": message_id,
             "score": score,
             "timestamp": time.time(),
-        })
+        }
+        self.response_quality_scores.append(quality)
+        self._pending_records.append({"t": "qs", "d": quality})
 
-    def get_tool_preference(self, tool_candidates: list[str], context: str = "general") -> list[dict]:
+    def get_tool_preference(self, tool_candidates: list[str], context: str = "general",
+                            top_k: Optional[int] = None) -> list[dict]:
         scored = []
         for tool_name in tool_candidates:
             policy = self.tool_policies.get(tool_name)
@@ -292,54 +511,50 @@ class RLHFEngine:
 
             scored.append({
                 "tool": tool_name,
-                "score": round(final_score, 4),
-                "confidence": round(policy.confidence, 4),
-                "avg_reward": round(policy.avg_reward, 4),
-                "success_rate": round(policy.success_count / policy.usage_count, 4) if policy.usage_count > 0 else 0,
+                "score": final_score,
+                "confidence": policy.confidence,
+                "avg_reward": policy.avg_reward,
+                "success_rate": policy.success_rate,
                 "reason": f"reward={policy.avg_reward:.2f}, conf={policy.confidence:.2f}",
             })
 
-        scored.sort(key=lambda x: x["score"], reverse=True)
+        if top_k is not None:
+            return heapq.nlargest(top_k, scored, key=itemgetter("score"))
+        scored.sort(key=itemgetter("score"), reverse=True)
         return scored
 
     def get_strategy_suggestion(self, task_type: str) -> dict:
-        relevant_feedback = [
-            f for f in self.feedback_history[-100:]
-            if f.context.get("task_type") == task_type
-        ]
-
-        positive = [f for f in relevant_feedback if f.value > 0]
-        negative = [f for f in relevant_feedback if f.value < 0]
-
-        successful_tools = {}
-        for f in positive:
-            for tool in f.context.get("tools_used", []):
-                successful_tools[tool] = successful_tools.get(tool, 0) + 1
-
-        failed_tools = {}
-        for f in negative:
-            for tool in f.context.get("tools_used", []):
-                failed_tools[tool] = failed_tools.get(tool, 0) + 1
+        successful_tools = Counter()
+        failed_tools = Counter()
+        relevant = positive = negative = 0
+        for f in self._by_task.get(task_type, ()):
+            relevant += 1
+            if f.value > 0:
+                positive += 1
+                successful_tools.update(f.context.get("tools_used", ()))
+            elif f.value < 0:
+                negative += 1
+                failed_tools.update(f.context.get("tools_used", ()))
 
         return {
             "task_type": task_type,
-            "total_feedback": len(relevant_feedback),
-            "positive_count": len(positive),
-            "negative_count": len(negative),
-            "satisfaction_rate": round(len(positive) / len(relevant_feedback), 4) if relevant_feedback else 0,
-            "recommended_tools": sorted(successful_tools.items(), key=lambda x: x[1], reverse=True)[:5],
-            "avoid_tools": sorted(failed_tools.items(), key=lambda x: x[1], reverse=True)[:3],
+            "total_feedback": relevant,
+            "positive_count": positive,
+            "negative_count": negative,
+            "satisfaction_rate": round(positive / relevant, 4) if relevant else 0,
+            "recommended_tools": successful_tools.most_common(5),
+            "avoid_tools": failed_tools.most_common(3),
             "suggestion": self._generate_suggestion(positive, negative, successful_tools, failed_tools),
         }
 
-    def _generate_suggestion(self, positive: list, negative: list,
+    def _generate_suggestion(self, positive: int, negative: int,
                              success_tools: dict, fail_tools: dict) -> str:
         if not positive and not negative:
             return "Belum ada data feedback untuk memberikan saran."
 
         parts = []
-        total = len(positive) + len(negative)
-        rate = len(positive) / total if total > 0 else 0
+        total = positive + negative
+        rate = positive / total if total > 0 else 0
 
         if rate >= 0.8:
             parts.append("Performa sangat baik. Pertahankan strategi saat ini.")
@@ -373,15 +588,15 @@ class RLHFEngine:
                 "tool_policies": {},
             }
 
-        positive = sum(1 for f in self.feedback_history if f.value > 0)
-        negative = sum(1 for f in self.feedback_history if f.value < 0)
+        positive = self._pos_count
+        negative = self._neg_count
         neutral = total - positive - negative
-        avg_score = sum(f.value for f in self.feedback_history) / total
+        avg_score = self._value_sum / total
 
-        recent = self.feedback_history[-20:]
-        older = self.feedback_history[-40:-20] if len(self.feedback_history) > 20 else []
-        recent_avg = sum(f.value for f in recent) / len(recent) if recent else 0
-        older_avg = sum(f.value for f in older) / len(older) if older else recent_avg
+        recent_count = min(len(self._recent_values), 20)
+        older_count = len(self._recent_values) - recent_count
+        recent_avg = self._recent_sum / recent_count if recent_count else 0
+        older_avg = self._older_sum / older_count if older_count else recent_avg
 
         if recent_avg > older_avg + 0.1:
             trend = "improving"
@@ -404,6 +619,10 @@ class RLHFEngine:
         }
 
     def get_learning_insights(self) -> dict:
+        cache_key = (self._policy_version, self._feedback_version)
+        if self._insights_cache is not None and self._insights_cache[0] == cache_key:
+            return {key: value.copy() for key, value in self._insights_cache[1].items()}
+
         insights = {
             "patterns": [],
             "recommendations": [],
@@ -418,8 +637,8 @@ class RLHFEngine:
                 elif policy.avg_reward < -0.2:
                     insights["patterns"].append(f"{name}: performa rendah (avg reward: {policy.avg_reward:.2f})")
 
-                best_ctx = max(policy.context_rewards.items(), key=lambda x: x[1], default=("", 0))
-                worst_ctx = min(policy.context_rewards.items(), key=lambda x: x[1], default=("", 0))
+                best_ctx = policy.best_context()
+                worst_ctx = policy.worst_context()
                 if best_ctx[0]:
                     insights["patterns"].append(f"{name} paling efektif untuk: {best_ctx[0]}")
                 if worst_ctx[0] and worst_ctx[1] < 0:
@@ -428,8 +647,9 @@ class RLHFEngine:
             insights["performance_by_tool"][name] = tool_data
 
         if self.feedback_history:
-            recent_scores = [f.value for f in self.feedback_history[-50:]]
-            avg = sum(recent_scores) / len(recent_scores)
+            count = min(len(self.feedback_history), 50)
+            recent = islice(self.feedback_history, len(self.feedback_history) - count, None)
+            avg = sum(map(_get_value, recent)) / count
             if avg < 0.3:
                 insights["recommendations"].append("Tingkatkan kualitas respons - skor rata-rata rendah.")
             if avg > 0.7:
@@ -439,12 +659,20 @@ class RLHFEngine:
         if low_confidence:
             insights["recommendations"].append(f"Kumpulkan lebih banyak data untuk: {', '.join(low_confidence)}")
 
-        return insights
+        self._insights_cache = (cache_key, insights)
+        return {key: value.copy() for key, value in insights.items()}
 
     def reset_policy(self, tool_name: Optional[str] = None):
-        if tool_name:
-            if tool_name in self.tool_policies:
-                self.tool_policies[tool_name] = ToolPolicy(tool_name)
-        else:
-            self.tool_policies.clear()
-        self._save_data()
+        with self._lock:
+            if tool_name:
+                if tool_name in self.tool_policies:
+                    self.tool_policies[tool_name] = ToolPolicy(tool_name)
+                    self._dirty_policies[tool_name] = None
+            else:
+                self.tool_policies.clear()
+                self._policy_cache.clear()
+                self._dirty_policies.clear()
+                self._policies_reset = True
+            self._policy_version += 1
+        self._flusher.mark_dirty()
+        self.flush()
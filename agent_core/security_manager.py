@@ -1,16 +1,24 @@
 """Security Manager - Audit keamanan, deteksi ancaman, dan logging keamanan."""
 
 import hashlib
-import json
 import logging
+import math
 import os
 import re
+import threading
 import time
+from collections import Counter, deque
+from itertools import count, islice
 from typing import Optional
 from enum import Enum
 
+from agent_core.persistence import DebouncedFlusher, atomic_write, json_dumps, json_loads, load_jsonl
+
 logger = logging.getLogger(__name__)
 
+_EVENT_ID_PREFIX = f"sec_{int(time.time() * 1000)}_"
+_event_counter = count()
+
 
 class ThreatLevel(Enum):
     LOW = "low"
@@ -33,10 +41,13 @@ class SecurityEventType(Enum):
 
 
 class SecurityEvent:
+    __slots__ = ("event_id", "event_type", "threat_level", "description", "source",
+                 "user_id", "details", "timestamp", "resolved")
+
     def __init__(self, event_type: SecurityEventType, threat_level: ThreatLevel,
                  description: str, source: str = "", user_id: str = "",
                  details: dict = None):
-        self.event_id = f"sec_{int(time.time() * 1000)}_{id(self) % 10000}"
+        self.event_id = f"{_EVENT_ID_PREFIX}{next(_event_counter)}"
         self.event_type = event_type
         self.threat_level = threat_level
         self.description = description
@@ -92,6 +103,40 @@ class SecurityPolicy:
             ".toml", ".ini", ".cfg", ".env", ".gitignore",
         ]
         self.max_upload_size_mb = 50
+        self.compile_patterns()
+
+    def compile_patterns(self):
+        self._compiled_blocked_commands = [(re.compile(p, re.IGNORECASE), p) for p in self.blocked_commands]
+        self._compiled_dangerous_patterns = [(re.compile(p, re.IGNORECASE), p) for p in self.dangerous_patterns]
+        self._blocked_union = self._union(self.blocked_commands, re.IGNORECASE)
+        self._dangerous_union = self._union(self.dangerous_patterns, re.IGNORECASE)
+        self._blocked_path_prefix = self._union([re.escape(p) for p in self.blocked_paths])
+
+    @staticmethod
+    def _union(patterns: list[str], flags: int = 0) -> Optional[re.Pattern]:
+        if not patterns:
+            return None
+        return re.compile("|".join(f"(?:{p})" for p in patterns), flags)
+
+    @staticmethod
+    def _first_match(union: Optional[re.Pattern], compiled: list, text: str) -> Optional[str]:
+        if union is None or not union.search(text):
+            return None
+        for rx, raw in compiled:
+            if rx.search(text):
+                return raw
+        return None
+
+    def match_blocked_command(self, command: str) -> Optional[str]:
+        return self._first_match(self._blocked_union, self._compiled_blocked_commands, command)
+
+    def match_dangerous_pattern(self, text: str) -> Optional[str]:
+        return self._first_match(self._dangerous_union, self._compiled_dangerous_patterns, text)
+
+    def match_blocked_path(self, normalized_path: str) -> Optional[str]:
+        if self._blocked_path_prefix is None or not self._blocked_path_prefix.match(normalized_path):
+            return None
+        return next(p for p in self.blocked_paths if normalized_path.startswith(p))
 
     def to_dict(self) -> dict:
         return {
@@ -106,84 +151,165 @@ class SecurityPolicy:
 
 
 class RateLimiter:
+    """Sliding-window counter: dua bucket tetap (sebelumnya, sekarang) per identifier.
+
+    Jumlah request di jendela diestimasi sebagai
+    ``prev * (sisa porsi jendela) + curr`` sehingga memori dan waktu per
+    pemeriksaan tetap O(1).
+    """
+
     def __init__(self, max_requests: int = 60, window_seconds: int = 60):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: dict[str, list[float]] = {}
+        self.buckets: dict[str, tuple[int, int, int]] = {}
+
+    def _roll(self, identifier: str, now: float) -> tuple[int, int, int, float]:
+        window = self.window_seconds
+        bucket = int(now // window)
+        stored = self.buckets.get(identifier)
+        if stored is None:
+            prev = curr = 0
+        else:
+            start, prev, curr = stored
+            if start != bucket:
+                prev = curr if start == bucket - 1 else 0
+                curr = 0
+        weight = (window - (now - bucket * window)) / window
+        return bucket, prev, curr, prev * weight + curr
 
     def check(self, identifier: str) -> bool:
-        now = time.time()
-        if identifier not in self.requests:
-            self.requests[identifier] = []
-
-        self.requests[identifier] = [
-            t for t in self.requests[identifier]
-            if now - t < self.window_seconds
-        ]
-
-        if len(self.requests[identifier]) >= self.max_requests:
+        bucket, prev, curr, estimate = self._roll(identifier, time.time())
+        if estimate >= self.max_requests:
+            self.buckets[identifier] = (bucket, prev, curr)
             return False
-
-        self.requests[identifier].append(now)
+        self.buckets[identifier] = (bucket, prev, curr + 1)
         return True
 
     def get_remaining(self, identifier: str) -> int:
-        now = time.time()
-        if identifier not in self.requests:
+        if identifier not in self.buckets:
             return self.max_requests
-        active = [t for t in self.requests[identifier] if now - t < self.window_seconds]
-        return max(0, self.max_requests - len(active))
+        estimate = self._roll(identifier, time.time())[3]
+        return max(0, self.max_requests - math.ceil(estimate))
 
 
 class SecurityManager:
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
-        self.log_file = os.path.join(data_dir, "security_log.json")
+        self.log_file = os.path.join(data_dir, "security_log.jsonl")
+        self.legacy_log_file = os.path.join(data_dir, "security_log.json")
         self.policy = SecurityPolicy()
         self.rate_limiter = RateLimiter(
             max_requests=self.policy.rate_limit_per_minute,
             window_seconds=60,
         )
-        self.security_events: list[SecurityEvent] = []
-        self.active_sessions: dict[str, dict] = {}
         self.max_events = 1000
+        self.security_events: deque[SecurityEvent] = deque(maxlen=self.max_events)
+        self.active_sessions: dict[str, dict] = {}
+        self.retention_seconds = 30 * 86400
+        self._lock = threading.RLock()
+        self._pending_events: list[SecurityEvent] = []
+        self._events_by_id: dict[str, SecurityEvent] = {}
+        self._by_type: Counter = Counter()
+        self._by_level: Counter = Counter()
+        self._unresolved = 0
+        self._recent_times: deque[float] = deque()
+        self._settings_cache: Optional[tuple[tuple[str, float], object]] = None
+        self._log_lines = 0
+        self._needs_compact = False
+        self._flusher = DebouncedFlusher(self._save_events, "security-log")
         self._load_events()
         logger.info("Security Manager diinisialisasi")
 
     def _load_events(self):
         os.makedirs(self.data_dir, exist_ok=True)
-        if os.path.exists(self.log_file):
+        if os.path.exists(self.legacy_log_file):
             try:
-                with open(self.log_file, "r") as f:
-                    data = json.load(f)
+                with open(self.legacy_log_file, "rb") as f:
+                    data = json_loads(f.read())
                 for ed in data.get("events", []):
-                    event = SecurityEvent(
-                        event_type=SecurityEventType(ed["event_type"]),
-                        threat_level=ThreatLevel(ed["threat_level"]),
-                        description=ed["description"],
-                        source=ed.get("source", ""),
-                        user_id=ed.get("user_id", ""),
-                        details=ed.get("details", {}),
-                    )
-                    event.event_id = ed["event_id"]
-                    event.timestamp = ed["timestamp"]
-                    event.resolved = ed.get("resolved", False)
-                    self.security_events.append(event)
-                logger.info(f"Security events dimuat: {len(self.security_events)}")
+                    self.security_events.append(self._event_from_dict(ed))
+                self._needs_compact = True
+            except Exception as e:
+                logger.warning(f"Gagal memuat security events lama: {e}")
+
+        if os.path.exists(self.log_file):
+            cutoff = time.time() - self.retention_seconds
+
+            def load_event(ed: dict):
+                if ed["timestamp"] < cutoff:
+                    self._needs_compact = True
+                else:
+                    self.security_events.append(self._event_from_dict(ed))
+
+            try:
+                good, bad = load_jsonl(self.log_file, load_event)
+                self._log_lines = good + bad
+                if bad:
+                    logger.warning(f"{bad} baris security log rusak dilewati")
+                    self._needs_compact = True
             except Exception as e:
                 logger.warning(f"Gagal memuat security events: {e}")
 
+        self._events_by_id = {e.event_id: e for e in self.security_events}
+        for event in self.security_events:
+            self._track_event(event)
+        if self.security_events:
+            logger.info(f"Security events dimuat: {len(self.security_events)}")
+        if self._needs_compact:
+            self._flusher.mark_dirty()
+
+    @staticmethod
+    def _event_from_dict(ed: dict) -> SecurityEvent:
+        event = SecurityEvent(
+            event_type=SecurityEventType(ed["event_type"]),
+            threat_level=ThreatLevel(ed["threat_level"]),
+            description=ed["description"],
+            source=ed.get("source", ""),
+            user_id=ed.get("user_id", ""),
+            details=ed.get("details", {}),
+        )
+        event.event_id = ed["event_id"]
+        event.timestamp = ed["timestamp"]
+        event.resolved = ed.get("resolved", False)
+        return event
+
     def _save_events(self):
         os.makedirs(self.data_dir, exist_ok=True)
-        data = {
-            "events": [e.to_dict() for e in self.security_events[-self.max_events:]],
-            "metadata": {
-                "last_updated": time.time(),
-                "total_events": len(self.security_events),
-            },
-        }
-        with open(self.log_file, "w") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with self._lock:
+            records, self._pending_events = self._pending_events, []
+            compact = self._needs_compact or self._log_lines + len(records) > 2 * self.max_events
+            if compact:
+                records = list(self.security_events)
+                self._needs_compact = False
+            lines = [json_dumps(e.to_dict()) + "\n" for e in records]
+        try:
+            if compact:
+                self._rewrite_log(lines)
+            elif lines:
+                with open(self.log_file, "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+                self._log_lines += len(lines)
+        except Exception:
+            # Append bisa tertulis sebagian; tulis ulang penuh dari memori agar tidak ada duplikat.
+            with self._lock:
+                self._needs_compact = self._needs_compact or compact or bool(lines)
+            raise
+
+    def compact(self):
+        """Tulis ulang log JSONL hanya dengan event yang masih disimpan di memori."""
+        with self._lock:
+            self._needs_compact = True
+        self._flusher.mark_dirty()
+        self._flusher.flush()
+
+    def _rewrite_log(self, lines: list[str]):
+        atomic_write(self.log_file, lines)
+        self._log_lines = len(lines)
+        if os.path.exists(self.legacy_log_file):
+            os.unlink(self.legacy_log_file)
+
+    def flush(self):
+        self._flusher.flush()
 
     def validate_command(self, command: str, user_id: str = "") -> dict:
         if len(command) > self.policy.max_command_length:
@@ -195,31 +321,30 @@ class SecurityManager:
             )
             return {"allowed": False, "reason": "Perintah terlalu panjang", "event_id": event.event_id}
 
-        cmd_lower = command.lower().strip()
-        for blocked in self.policy.blocked_commands:
-            if re.search(blocked, cmd_lower):
-                event = self._log_event(
-                    SecurityEventType.COMMAND_BLOCKED, ThreatLevel.HIGH,
-                    f"Perintah berbahaya diblokir: {command[:100]}",
-                    source="shell_tool", user_id=user_id,
-                    details={"command": command[:200], "matched_rule": blocked},
-                )
-                return {"allowed": False, "reason": f"Perintah diblokir (rule: {blocked})", "event_id": event.event_id}
+        blocked = self.policy.match_blocked_command(command)
+        if blocked is not None:
+            event = self._log_event(
+                SecurityEventType.COMMAND_BLOCKED, ThreatLevel.HIGH,
+                f"Perintah berbahaya diblokir: {command[:100]}",
+                source="shell_tool", user_id=user_id,
+                details={"command": command[:200], "matched_rule": blocked},
+            )
+            return {"allowed": False, "reason": f"Perintah diblokir (rule: {blocked})", "event_id": event.event_id}
 
         return {"allowed": True, "reason": "OK"}
 
     def validate_file_path(self, path: str, operation: str = "read", user_id: str = "") -> dict:
         normalized = os.path.normpath(path)
 
-        for blocked in self.policy.blocked_paths:
-            if normalized.startswith(blocked):
-                event = self._log_event(
-                    SecurityEventType.PATH_VIOLATION, ThreatLevel.HIGH,
-                    f"Akses path terlarang: {path}",
-                    source="file_tool", user_id=user_id,
-                    details={"path": path, "operation": operation, "matched_rule": blocked},
-                )
-                return {"allowed": False, "reason": f"Path terlarang: {blocked}", "event_id": event.event_id}
+        blocked = self.policy.match_blocked_path(normalized)
+        if blocked is not None:
+            event = self._log_event(
+                SecurityEventType.PATH_VIOLATION, ThreatLevel.HIGH,
+                f"Akses path terlarang: {path}",
+                source="file_tool", user_id=user_id,
+                details={"path": path, "operation": operation, "matched_rule": blocked},
+            )
+            return {"allowed": False, "reason": f"Path terlarang: {blocked}", "event_id": event.event_id}
 
         if ".." in path:
             event = self._log_event(
@@ -233,20 +358,20 @@ class SecurityManager:
         return {"allowed": True, "reason": "OK"}
 
     def validate_input(self, text: str, input_type: str = "general", user_id: str = "") -> dict:
-        for pattern in self.policy.dangerous_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                event = self._log_event(
-                    SecurityEventType.INJECTION_ATTEMPT, ThreatLevel.HIGH,
-                    f"Pola berbahaya terdeteksi dalam {input_type}",
-                    source=input_type, user_id=user_id,
-                    details={"pattern": pattern, "input_preview": text[:200]},
-                )
-                return {
-                    "safe": False,
-                    "reason": f"Pola berbahaya terdeteksi",
-                    "event_id": event.event_id,
-                    "threat_level": "high",
-                }
+        pattern = self.policy.match_dangerous_pattern(text)
+        if pattern is not None:
+            event = self._log_event(
+                SecurityEventType.INJECTION_ATTEMPT, ThreatLevel.HIGH,
+                f"Pola berbahaya terdeteksi dalam {input_type}",
+                source=input_type, user_id=user_id,
+                details={"pattern": pattern, "input_preview": text[:200]},
+            )
+            return {
+                "safe": False,
+                "reason": f"Pola berbahaya terdeteksi",
+                "event_id": event.event_id,
+                "threat_level": "high",
+            }
 
         return {"safe": True, "reason": "OK"}
 
@@ -279,12 +404,16 @@ class SecurityManager:
             user_id=user_id,
             details=details,
         )
-        self.security_events.append(event)
-
-        if len(self.security_events) > self.max_events:
-            self.security_events = self.security_events[-self.max_events:]
-
-        self._save_events()
+        with self._lock:
+            events = self.security_events
+            evicted = events[0] if len(events) == events.maxlen else None
+            events.append(event)
+            self._events_by_id[event.event_id] = event
+            self._track_event(event)
+            if evicted is not None:
+                self._untrack_event(evicted)
+            self._pending_events.append(event)
+        self._flusher.mark_dirty()
 
         log_msg = f"[SECURITY] {threat_level.value.upper()}: {description}"
         if threat_level in (ThreatLevel.HIGH, ThreatLevel.CRITICAL):
@@ -294,6 +423,32 @@ class SecurityManager:
 
         return event
 
+    def _track_event(self, event: SecurityEvent):
+        self._by_type[event.event_type.value] += 1
+        self._by_level[event.threat_level.value] += 1
+        self._unresolved += not event.resolved
+        self._recent_times.append(event.timestamp)
+
+    def _untrack_event(self, event: SecurityEvent):
+        if self._events_by_id.get(event.event_id) is event:
+            del self._events_by_id[event.event_id]
+        self._by_type[event.event_type.value] -= 1
+        self._by_level[event.threat_level.value] -= 1
+        self._unresolved -= not event.resolved
+        if len(self._recent_times) > len(self.security_events):
+            self._recent_times.popleft()
+
+    def _load_settings(self, settings_file: str):
+        key = (settings_file, os.stat(settings_file).st_mtime)
+        if self._settings_cache is not None and self._settings_cache[0] == key:
+            return self._settings_cache[1]
+        import yaml
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        with open(settings_file) as f:
+            config = yaml.load(f, Loader=loader)
+        self._settings_cache = (key, config)
+        return config
+
     def run_audit(self) -> dict:
         findings = []
         score = 100
@@ -309,9 +464,7 @@ class SecurityManager:
         settings_file = os.path.join(config_dir, "settings.yaml")
         if os.path.exists(settings_file):
             try:
-                import yaml
-                with open(settings_file) as f:
-                    config = yaml.safe_load(f)
+                config = self._load_settings(settings_file)
                 if config:
                     findings.append({"check": "Configuration file valid", "status": "pass", "severity": "info"})
                 else:
@@ -357,14 +510,19 @@ class SecurityManager:
             findings.append({"check": "No rate limiting", "status": "fail", "severity": "high"})
             score -= 15
 
-        recent_events = [e for e in self.security_events if time.time() - e.timestamp < 86400]
-        high_severity = [e for e in recent_events if e.threat_level in (ThreatLevel.HIGH, ThreatLevel.CRITICAL)]
+        cutoff = time.time() - 86400
+        high_severity = 0
+        for event in reversed(self.security_events):
+            if event.timestamp <= cutoff:
+                break
+            if event.threat_level in (ThreatLevel.HIGH, ThreatLevel.CRITICAL):
+                high_severity += 1
         if high_severity:
             findings.append({
-                "check": f"{len(high_severity)} high/critical events in last 24h",
+                "check": f"{high_severity} high/critical events in last 24h",
                 "status": "warning", "severity": "high",
             })
-            score -= min(20, len(high_severity) * 5)
+            score -= min(20, high_severity * 5)
 
         score = max(0, min(100, score))
         if score >= 80:
@@ -400,33 +558,23 @@ class SecurityManager:
                 "policy": self.policy.to_dict(),
             }
 
-        by_type = {}
-        by_level = {}
-        recent_24h = 0
-        unresolved = 0
-        now = time.time()
-
-        for event in self.security_events:
-            et = event.event_type.value
-            tl = event.threat_level.value
-            by_type[et] = by_type.get(et, 0) + 1
-            by_level[tl] = by_level.get(tl, 0) + 1
-            if now - event.timestamp < 86400:
-                recent_24h += 1
-            if not event.resolved:
-                unresolved += 1
+        recent = self._recent_times
+        cutoff = time.time() - 86400
+        while recent and recent[0] <= cutoff:
+            recent.popleft()
 
         return {
             "total_events": total,
-            "by_type": by_type,
-            "by_level": by_level,
-            "recent_24h": recent_24h,
-            "unresolved": unresolved,
+            "by_type": {k: v for k, v in self._by_type.items() if v},
+            "by_level": {k: v for k, v in self._by_level.items() if v},
+            "recent_24h": len(recent),
+            "unresolved": self._unresolved,
             "policy": self.policy.to_dict(),
         }
 
     def get_recent_events(self, limit: int = 50, threat_level: Optional[str] = None) -> list[dict]:
-        events = self.security_events[-limit:]
+        start = max(0, len(self.security_events) - limit) if limit > 0 else -limit
+        events = list(islice(self.security_events, start, None))
         if threat_level:
             try:
                 level = ThreatLevel(threat_level)
@@ -436,9 +584,14 @@ class SecurityManager:
         return [e.to_dict() for e in reversed(events)]
 
     def resolve_event(self, event_id: str) -> bool:
-        for event in self.security_events:
-            if event.event_id == event_id:
-                event.resolved = True
-                self._save_events()
-                return True
-        return False
+        with self._lock:
+            event = self._events_by_id.get(event_id)
+            if event is None:
+                return False
+            if not event.resolved:
+                self._unresolved -= 1
+            event.resolved = True
+            self._needs_compact = True
+        self._flusher.mark_dirty()
+        self.flush()
+        return True
@@ -2,12 +2,16 @@
 
 import json
 import logging
+import re
+from collections import Counter
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 
 class ToolInfo:
+    __slots__ = ("name", "description", "keywords", "enabled")
+
     def __init__(self, name: str, description: str, keywords: list[str], enabled: bool = True):
         self.name = name
         self.description = description
@@ -76,9 +80,33 @@ class ToolSelector:
     def __init__(self, config_path: Optional[str] = None):
         self.tools = {tool.name: tool for tool in TOOL_REGISTRY}
         self.usage_history: list[dict] = []
+        self._build_keyword_index()
         if config_path:
             self._load_config(config_path)
 
+    def _build_keyword_index(self):
+        self._kw_index: dict[str, list[str]] = {}
+        for tool in self.tools.values():
+            for keyword in tool.keywords:
+                self._kw_index.setdefault(keyword, []).append(tool.name)
+        keywords = sorted(self._kw_index, key=len, reverse=True)
+        self._kw_pattern = re.compile("(?=(" + "|".join(re.escape(kw) for kw in keywords) + "))")
+        self._kw_contained = {
+            kw: tuple(other for other in keywords if other != kw and other in kw) for kw in keywords
+        }
+
+    def _count_keywords(self, text: str) -> Counter:
+        found = set()
+        for match in self._kw_pattern.finditer(text):
+            kw = match.group(1)
+            if kw not in found:
+                found.add(kw)
+                found.update(self._kw_contained[kw])
+        counts = Counter()
+        for kw in found:
+            counts.update(self._kw_index[kw])
+        return counts
+
     def _load_config(self, config_path: str):
         try:
             with open(config_path, "r") as f:
@@ -92,20 +120,16 @@ class ToolSelector:
             logger.warning(f"Gagal memuat konfigurasi alat: {e}")
 
     def select_tools(self, intent: str, context: Optional[dict] = None, top_k: int = 3) -> list[ToolInfo]:
-        intent_lower = intent.lower()
+        intent_hits = self._count_keywords(intent.lower())
+        # json.dumps (bukan orjson) agar teks yang dicocokkan identik: separator dan escape \uXXXX.
+        context_hits = self._count_keywords(json.dumps(context).lower()) if context else Counter()
         scored: list[tuple[ToolInfo, float]] = []
         for tool in self.tools.values():
             if not tool.enabled:
                 continue
-            score = 0.0
-            for keyword in tool.keywords:
-                if keyword in intent_lower:
-                    score += 1.0
-            if context:
-                context_str = json.dumps(context).lower()
-                for keyword in tool.keywords:
-                    if keyword in context_str:
-                        score += 0.3
+            score = float(intent_hits[tool.name])
+            for _ in range(context_hits[tool.name]):
+                score += 0.3
             if score > 0:
                 scored.append((tool, score))
         scored.sort(key=lambda x: x[1], reverse=True)
@@ -1,15 +1,20 @@
 """User Manager - Manajemen profil pengguna dan preferensi."""
 
-import json
+import atexit
 import logging
 import os
+import threading
 import time
 from typing import Optional
 
+from agent_core.persistence import DebouncedFlusher, json_loads, write_json
+
 logger = logging.getLogger(__name__)
 
 
 class UserProfile:
+    __slots__ = ("user_id", "name", "preferences", "created_at", "last_active", "interaction_count")
+
     def __init__(self, user_id: str, name: str = "", preferences: Optional[dict] = None):
         self.user_id = user_id
         self.name = name
@@ -51,13 +56,17 @@ class UserManager:
     def __init__(self, profiles_path: str = "data/user_profiles.json"):
         self.profiles_path = profiles_path
         self.profiles: dict[str, UserProfile] = {}
+        self._lock = threading.RLock()
+        self._touched = False
+        self._flusher = DebouncedFlusher(self._save_profiles, "user-profiles")
         self._load_profiles()
+        atexit.register(self.flush)
 
     def _load_profiles(self):
         if os.path.exists(self.profiles_path):
             try:
-                with open(self.profiles_path, "r") as f:
-                    data = json.load(f)
+                with open(self.profiles_path, "rb") as f:
+                    data = json_loads(f.read())
                 for profile_data in data.get("profiles", []):
                     profile = UserProfile.from_dict(profile_data)
                     self.profiles[profile.user_id] = profile
@@ -67,32 +76,43 @@ class UserManager:
 
     def _save_profiles(self):
         os.makedirs(os.path.dirname(self.profiles_path) or ".", exist_ok=True)
-        data = {
-            "profiles": [p.to_dict() for p in self.profiles.values()],
-            "metadata": {
-                "version": "1.0.0",
-                "last_updated": time.time(),
-            },
-        }
-        with open(self.profiles_path, "w") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with self._lock:
+            self._touched = False
+            data = {
+                "profiles": [p.to_dict() for p in self.profiles.values()],
+                "metadata": {
+                    "version": "1.0.0",
+                    "last_updated": time.time(),
+                },
+            }
+        write_json(self.profiles_path, data)
+
+    def flush(self):
+        if self._touched:
+            self._flusher.mark_dirty()
+        self._flusher.flush()
 
     def get_or_create_profile(self, user_id: str, name: str = "") -> UserProfile:
-        if user_id not in self.profiles:
-            self.profiles[user_id] = UserProfile(user_id=user_id, name=name)
-            self._save_profiles()
+        with self._lock:
+            created = user_id not in self.profiles
+            if created:
+                self.profiles[user_id] = UserProfile(user_id=user_id, name=name)
+            profile = self.profiles[user_id]
+            profile.last_active = time.time()
+            profile.interaction_count += 1
+            self._touched = True
+        if created:
+            self._flusher.mark_dirty()
             logger.info(f"Profil baru dibuat: {user_id}")
-        profile = self.profiles[user_id]
-        profile.last_active = time.time()
-        profile.interaction_count += 1
         return profile
 
     def update_preference(self, user_id: str, key: str, value) -> bool:
         profile = self.profiles.get(user_id)
         if not profile:
             return False
-        profile.preferences[key] = value
-        self._save_profiles()
+        with self._lock:
+            profile.preferences[key] = value
+        self._flusher.mark_dirty()
         logger.info(f"Preferensi diperbarui untuk {user_id}: {key}={value}")
         return True
 
@@ -106,11 +126,12 @@ class UserManager:
         return [p.to_dict() for p in self.profiles.values()]
 
     def delete_profile(self, user_id: str) -> bool:
-        if user_id in self.profiles:
-            del self.profiles[user_id]
-            self._save_profiles()
-            return True
-        return False
+        with self._lock:
+            if self.profiles.pop(user_id, None) is None:
+                return False
+        self._flusher.mark_dirty()
+        return True
 
     def save(self):
-        self._save_profiles()
+        self._flusher.mark_dirty()
+        self.flush()
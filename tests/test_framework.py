@@ -5,6 +5,7 @@ import json
 import logging
 import os
 import sys
+import tempfile
 import time
 import traceback
 from typing import Optional, Callable
@@ -125,6 +126,21 @@ def create_test_suite() -> TestSuite:
     suite.add_test("Slides - Manage Slides", test_slides_manage, "tools")
     suite.add_test("Slides - Export HTML", test_slides_export_html, "tools")
 
+    suite.add_test("Persistence - Torn JSONL Tail", test_jsonl_torn_tail, "persistence")
+    suite.add_test("Persistence - Loader Errors Are Not Corruption", test_jsonl_loader_error, "persistence")
+    suite.add_test("Persistence - Atomic Write Mode", test_atomic_write_mode, "persistence")
+    suite.add_test("Persistence - Debounced Flush Retry", test_debounced_flusher_retry, "persistence")
+    suite.add_test("Security - Log Append/Reload", test_security_log_reload, "persistence")
+    suite.add_test("Security - Compact/Flush/Reload", test_security_log_compact, "persistence")
+    suite.add_test("Security - Torn Log Tail", test_security_log_torn_tail, "persistence")
+    suite.add_test("Security - Rate Limit Bucket Boundary", test_rate_limiter_boundary, "security")
+    suite.add_test("RLHF - Feedback Append/Reload", test_rlhf_feedback_reload, "persistence")
+    suite.add_test("RLHF - Compact/Flush/Reload", test_rlhf_feedback_compact, "persistence")
+    suite.add_test("Meta-Learner - Pattern Append/Reload", test_meta_patterns_reload, "persistence")
+    suite.add_test("Meta-Learner - Performance Min/Max", test_performance_tracker_min_max, "learning")
+    suite.add_test("Meta-Learner - Task Classifier", test_meta_task_classifier, "learning")
+    suite.add_test("LLM Client - Stream Sanitizer", test_stream_sanitizer, "llm")
+
     return suite
 
 
@@ -505,6 +521,233 @@ def test_slides_export_html():
     return "Slides export HTML OK"
 
 
+def test_jsonl_torn_tail():
+    from agent_core.persistence import load_jsonl
+    path = os.path.join(tempfile.mkdtemp(prefix="test_jsonl_"), "log.jsonl")
+    with open(path, "wb") as f:
+        f.write(b'{"n": 1}\nnot json\n{"n": 2}\n{"n": ')
+    records = []
+    good, bad = load_jsonl(path, records.append)
+    assert (good, bad) == (2, 2), f"Unexpected counts: {(good, bad)}"
+    assert [r["n"] for r in records] == [1, 2]
+    with open(path, "rb") as f:
+        assert f.read().endswith(b'{"n": 2}\n'), "Torn tail not truncated"
+
+    with open(path, "ab") as f:
+        f.write(b'{"n": 3}')
+    records.clear()
+    assert load_jsonl(path, records.append) == (3, 1)
+    with open(path, "rb") as f:
+        assert f.read().endswith(b'{"n": 3}\n'), "Valid tail not terminated"
+    return "JSONL torn tail OK"
+
+
+def test_jsonl_loader_error():
+    from agent_core.persistence import load_jsonl
+    path = os.path.join(tempfile.mkdtemp(prefix="test_jsonl_"), "log.jsonl")
+    with open(path, "w") as f:
+        f.write('{"n": 1}\n{"other": 2}\n')
+    loaded = []
+    good, bad = load_jsonl(path, lambda r: loaded.append(r["n"]))
+    assert bad == 0, "Loader errors must not be counted as corrupt lines"
+    assert good == 2 and loaded == [1]
+    return "JSONL loader errors OK"
+
+
+def test_atomic_write_mode():
+    from agent_core.persistence import write_json, json_loads
+    path = os.path.join(tempfile.mkdtemp(prefix="test_atomic_"), "data.json")
+    write_json(path, {"text": "caf\u00e9"})
+    os.chmod(path, 0o640)
+    write_json(path, {"text": "na\u00efve"})
+    assert os.stat(path).st_mode & 0o777 == 0o640, "Existing file mode not preserved"
+    with open(path, "rb") as f:
+        assert json_loads(f.read())["text"] == "na\u00efve"
+    return "Atomic write mode OK"
+
+
+def test_debounced_flusher_retry():
+    from agent_core.persistence import DebouncedFlusher
+    calls = []
+
+    def save():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("disk full")
+
+    flusher = DebouncedFlusher(save, "test", delay=60)
+    flusher.flush()
+    assert not calls, "Clean flusher must not save"
+    flusher.mark_dirty()
+    flusher.flush()
+    assert flusher.dirty, "Failed save must be retried"
+    flusher.flush()
+    assert len(calls) == 2 and not flusher.dirty
+    return "Debounced flusher retry OK"
+
+
+def _log_blocked_commands(mgr, count: int):
+    for i in range(count):
+        mgr.validate_command(f"rm -rf / # {i}")
+
+
+def test_security_log_reload():
+    from agent_core.security_manager import SecurityManager
+    data_dir = tempfile.mkdtemp(prefix="test_security_")
+    mgr = SecurityManager(data_dir)
+    _log_blocked_commands(mgr, 5)
+    mgr.flush()
+    _log_blocked_commands(mgr, 3)
+    mgr.flush()
+
+    reloaded = SecurityManager(data_dir)
+    ids = [e.event_id for e in reloaded.security_events]
+    assert ids == [e.event_id for e in mgr.security_events]
+    assert reloaded.get_security_stats()["total_events"] == 8
+    return "Security log reload OK"
+
+
+def test_security_log_compact():
+    from agent_core.security_manager import SecurityManager
+    data_dir = tempfile.mkdtemp(prefix="test_security_")
+    mgr = SecurityManager(data_dir)
+    _log_blocked_commands(mgr, 8)
+    mgr.compact()
+    mgr.flush()
+    with open(mgr.log_file) as f:
+        assert len(f.readlines()) == 8, "Compaction duplicated pending events"
+    assert SecurityManager(data_dir).get_security_stats()["total_events"] == 8
+    return "Security log compact OK"
+
+
+def test_security_log_torn_tail():
+    from agent_core.security_manager import SecurityManager
+    data_dir = tempfile.mkdtemp(prefix="test_security_")
+    mgr = SecurityManager(data_dir)
+    _log_blocked_commands(mgr, 3)
+    mgr.flush()
+    with open(mgr.log_file, "a") as f:
+        f.write('{"event_id": "torn", "event_ty')
+
+    reloaded = SecurityManager(data_dir)
+    reloaded.flush()
+    assert reloaded.get_security_stats()["total_events"] == 3
+    with open(mgr.log_file) as f:
+        lines = f.readlines()
+    assert len(lines) == 3 and "torn" not in "".join(lines)
+    return "Security torn tail OK"
+
+
+def test_rate_limiter_boundary():
+    from unittest import mock
+    from agent_core.security_manager import RateLimiter
+    limiter = RateLimiter(max_requests=4, window_seconds=60)
+    now = [60 * 100 + 50.0]
+    with mock.patch("agent_core.security_manager.time.time", lambda: now[0]):
+        assert all(limiter.check("u") for _ in range(4))
+        assert not limiter.check("u"), "Limit not enforced within a bucket"
+
+        now[0] = 60 * 101.0
+        assert not limiter.check("u"), "Previous bucket not carried over"
+
+        now[0] = 60 * 101 + 30.0
+        assert limiter.check("u") and limiter.check("u")
+        assert not limiter.check("u"), "Weighted estimate not applied"
+        assert limiter.get_remaining("u") == 0
+
+        now[0] = 60 * 103 + 1.0
+        assert limiter.get_remaining("u") == 4, "Stale buckets not reset"
+    return "Rate limiter boundary OK"
+
+
+def test_rlhf_feedback_reload():
+    from agent_core.rlhf_engine import RLHFEngine
+    data_dir = tempfile.mkdtemp(prefix="test_rlhf_")
+    engine = RLHFEngine(data_dir)
+    for i in range(3):
+        engine.record_feedback("s1", f"m{i}", "thumbs_up", 1.0, context={"task_type": "code"})
+    engine.record_tool_outcome("shell_tool", True, 500, context="code")
+    engine.flush()
+
+    reloaded = RLHFEngine(data_dir)
+    assert len(reloaded.feedback_history) == 3
+    assert len(reloaded.reward_history) == 1
+    assert reloaded.get_feedback_stats()["positive"] == 3
+    return "RLHF feedback reload OK"
+
+
+def test_rlhf_feedback_compact():
+    from agent_core.rlhf_engine import RLHFEngine
+    data_dir = tempfile.mkdtemp(prefix="test_rlhf_")
+    engine = RLHFEngine(data_dir)
+    for i in range(3):
+        engine.record_feedback("s1", f"m{i}", "thumbs_up", 1.0, context={"task_type": "code"})
+    engine.compact()
+    engine.flush()
+
+    reloaded = RLHFEngine(data_dir)
+    assert len(reloaded.feedback_history) == 3, "Compaction replayed pending records"
+    assert len(reloaded._by_task["code"]) == 3
+    return "RLHF feedback compact OK"
+
+
+def test_meta_patterns_reload():
+    from agent_core.meta_learner import MetaLearner
+    data_dir = tempfile.mkdtemp(prefix="test_meta_")
+    learner = MetaLearner(data_dir)
+    learner.record_execution("debug this script", ["shell_tool"], True, 120, 2)
+    learner.record_execution("search the docs", ["search_tool"], False, 300, 3)
+    learner.flush()
+    with open(learner.patterns_file, "a") as f:
+        f.write('{"pattern_id": "torn"')
+
+    reloaded = MetaLearner(data_dir)
+    assert [p.task_type for p in reloaded.execution_patterns] == ["code", "search"]
+    return "Meta-learner pattern reload OK"
+
+
+def test_performance_tracker_min_max():
+    import random
+    from agent_core.meta_learner import PerformanceTracker
+    tracker = PerformanceTracker()
+    rng = random.Random(7)
+    for _ in range(PerformanceTracker.max_values * 3):
+        tracker.record_metric("duration_ms", rng.uniform(0, 1000))
+        values = tracker.metrics["duration_ms"]
+        stats = tracker.to_dict()["duration_ms"]
+        assert stats["min"] == min(values) and stats["max"] == max(values)
+    return "Performance tracker min/max OK"
+
+
+def test_meta_task_classifier():
+    from agent_core.meta_learner import MetaLearner
+    learner = MetaLearner(tempfile.mkdtemp(prefix="test_meta_"))
+    assert learner.classify_task("please debug this python script") == "code"
+    assert learner.classify_task("nothing relevant here") == "general"
+    try:
+        learner.task_type_classifier["greeting"] = ["hello"]
+        raise AssertionError("Classifier mapping must be read-only")
+    except TypeError:
+        pass
+    learner.task_type_classifier = {**learner.task_type_classifier, "greeting": ["hello"]}
+    assert learner.classify_task("hello") == "greeting"
+    return "Task classifier OK"
+
+
+def test_stream_sanitizer():
+    from agent_core.llm_client import _StreamSanitizer, sanitize_response
+    sanitizer = _StreamSanitizer()
+    assert sanitizer.feed("plain text") == "plain text"
+    chunks = ["safe <scr", "ipt>alert(1)</scr", "ipt> and java", "script: done"]
+    out = [sanitizer.feed(c) for c in chunks]
+    assert out[0] == "safe ", "Only the possible partial match may be held back"
+    out.append(sanitizer.flush())
+    streamed = "".join(out)
+    assert streamed == sanitize_response("".join(chunks)), streamed
+    assert "<script" not in streamed and "javascript:" not in streamed
+    return "Stream sanitizer OK"
+
+
 async def run_all_tests() -> dict:
     suite = create_test_suite()
     return await suite.run_all()
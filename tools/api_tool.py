@@ -6,7 +6,7 @@ import logging
 import time
 import xml.etree.ElementTree as ET
 from typing import Optional
-from collections import defaultdict
+from collections import defaultdict, deque
 
 import aiohttp
 
@@ -32,7 +32,7 @@ class ApiTool:
         self.cache_ttl = cache_ttl
         self._session: Optional[aiohttp.ClientSession] = None
         self._cache: dict[str, dict] = {}
-        self._rate_limits: dict[str, list[float]] = defaultdict(list)
+        self._rate_limits: dict[str, deque[float]] = defaultdict(deque)
         self.request_history: list[dict] = []
 
     async def _get_session(self) -> aiohttp.ClientSession:
@@ -182,15 +182,17 @@ class ApiTool:
         hostname = urlparse(url).hostname or "unknown"
         now = time.time()
 
-        self._rate_limits[hostname] = [t for t in self._rate_limits[hostname] if now - t < 60]
+        timestamps = self._rate_limits[hostname]
+        while timestamps and now - timestamps[0] >= 60:
+            timestamps.popleft()
 
-        if len(self._rate_limits[hostname]) >= self.rate_limit_per_host:
+        if len(timestamps) >= self.rate_limit_per_host:
             return (
                 f"Error: rate limit tercapai untuk '{hostname}' "
                 f"({self.rate_limit_per_host} request/menit). Coba lagi nanti."
             )
 
-        self._rate_limits[hostname].append(now)
+        timestamps.append(now)
         return None
 
     def _parse_response_body(self, body: str, content_type: str) -> str:
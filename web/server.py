@@ -46,7 +46,7 @@ from web.database import (
     save_uploaded_file, get_uploaded_files, get_uploaded_file, delete_uploaded_file
 )
 from agent_core.agent_loop import AgentLoop, SYSTEM_PROMPT, detect_intent
-from agent_core.llm_client import LLMClient, AVAILABLE_MODELS, MODEL_CATEGORIES
+from agent_core.llm_client import LLMClient, AVAILABLE_MODELS, MODEL_CATEGORIES, shutdown_shared_session
 from agent_core.knowledge_base import KnowledgeBase
 from agent_core.context_manager import ContextManager
 from agent_core.rlhf_engine import RLHFEngine
@@ -86,6 +86,9 @@ async def lifespan(app):
     system_monitor.health.register_check("agent", lambda: "OK" if agent_loop else "not initialized")
     logger.info("Manus Agent Web Server started")
     yield
+    await shutdown_shared_session()
+    rlhf_engine.flush()
+    security_manager.flush()
 
 app = FastAPI(title="Manus Agent", version="1.0.0", lifespan=lifespan)
 
@@ -1074,7 +1077,7 @@ async def api_list_models(category: Optional[str] = None):
     return {
         "models": models,
         "current": current,
-        "categories": MODEL_CATEGORIES,
+        "categories": dict(MODEL_CATEGORIES),
     }
 
 